@@ -0,0 +1,216 @@
+"""Drives the Chess and Misc commands with fake Discord objects against a temporary database.
+
+Every simulated player plays random legal moves in their open games, and now and then
+checks their games, elo or the leaderboard. Nothing is sent to Discord.
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+_directory = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = f"sqlite:///{os.path.join(_directory.name, 'bench.db')}"
+
+import chess
+
+from chessbot import bot, database
+from chessbot.cogs.utils import leaderboard, start_render_pool, stop_render_pool
+
+
+class FakeMember:
+    def __init__(self, user_id: int) -> None:
+        self.id = user_id
+        self.name = f"player{user_id}"
+        self.discriminator = "0000"
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+
+
+class FakeCommand:
+    def __init__(self, name: str) -> None:
+        self.name = self.qualified_name = name
+
+
+class FakeContext:
+    def __init__(self, author: FakeMember, command: str) -> None:
+        self.bot = bot
+        self.author = author
+        self.command = FakeCommand(command)
+        self.command_failed = False
+        self.sent: List[Any] = []
+
+    async def send(self, content: str = None, **kwargs: Any) -> None:
+        self.sent.append(content)
+
+
+class Simulation:
+    def __init__(self, players: int, games: int, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.players = [FakeMember(10 ** 6 + i) for i in range(players)]
+        self.games_per_player = games
+
+        self.boards: Dict[int, chess.Board] = {}  # game id -> the expected board
+        self.sides: Dict[int, List[int]] = {}  # game id -> [white id, black id]
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors = 0
+
+    async def invoke(
+        self, cog_name: str, name: str, author: FakeMember, *args: Any
+    ) -> FakeContext:
+        # what discord.py does around a command, minus the parsing and the checks
+        cog = bot.get_cog(cog_name)
+        ctx = FakeContext(author, name)
+
+        start = time.perf_counter()
+        await cog.cog_before_invoke(ctx)
+        if getattr(bot, "_before_invoke", None) is not None:
+            await bot._before_invoke(ctx)
+        try:
+            await getattr(cog, name).callback(cog, ctx, *args)
+        except Exception:
+            ctx.command_failed = True
+            self.errors += 1
+        finally:
+            await cog.cog_after_invoke(ctx)
+            if getattr(bot, "_after_invoke", None) is not None:
+                await bot._after_invoke(ctx)
+        self.latencies[name].append(time.perf_counter() - start)
+
+        return ctx
+
+    async def start_game(self, white: FakeMember, black: FakeMember) -> None:
+        await self.invoke("Chess", "play", white, black)
+
+        def get_last_game_id() -> int:
+            return (
+                database.session.query(database.User.last_game_id)
+                .filter_by(discord_id=white.id)
+                .scalar()
+            )
+
+        with database.session_scope():
+            game_id = await database.run_sync(get_last_game_id)
+        self.boards[game_id] = chess.Board()
+        self.sides[game_id] = [white.id, black.id]
+
+    async def setup(self) -> None:
+        count = len(self.players)
+        for i in range(count * self.games_per_player // 2):
+            white = self.players[i % count]
+            black = self.players[(i + 1 + i // count) % count]
+            if white is black:
+                black = self.players[(i + 1) % count]
+            await self.start_game(white, black)
+
+    def playable_games(self, player: FakeMember) -> List[int]:
+        return [
+            game_id
+            for game_id, board in self.boards.items()
+            if self.sides[game_id][0 if board.turn == chess.WHITE else 1] == player.id
+        ]
+
+    async def play_move(self, player: FakeMember) -> Optional[int]:
+        games = self.playable_games(player)
+        if not games:
+            return None
+
+        game_id = self.rng.choice(games)
+        board = self.boards[game_id]
+        move = self.rng.choice(list(board.legal_moves))
+        san = board.san(move)
+
+        ctx = await self.invoke("Chess", "move", player, san, game_id)
+        board.push(move)
+        if ctx.command_failed or board.is_game_over():
+            del self.boards[game_id]  # finished, or out of sync with the bot
+
+        return game_id
+
+    async def run_player(self, player: FakeMember, commands: int) -> None:
+        for _ in range(commands):
+            roll = self.rng.random()
+            if roll < 0.04:
+                await self.invoke("Misc", "games", player)
+            elif roll < 0.07:
+                await self.invoke("Misc", "leaderboard", player)
+            elif roll < 0.1:
+                await self.invoke("Misc", "elo", player)
+            elif await self.play_move(player) is None:
+                if len(self.playable_games(player)) + 1 < self.games_per_player:
+                    opponent = self.rng.choice(
+                        [other for other in self.players if other is not player]
+                    )
+                    await self.start_game(player, opponent)
+                else:
+                    await asyncio.sleep(0)  # waiting for the opponents to move
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def get_peak_rss_mb() -> float:
+    # kilobytes on Linux, the render pool processes are counted as children
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (own + children) / 1024
+
+
+async def run(args: argparse.Namespace) -> None:
+    simulation = Simulation(args.players, args.games, args.seed)
+
+    start = time.perf_counter()
+    await simulation.setup()
+    print(
+        f"setup: {len(simulation.boards)} games in {time.perf_counter() - start:.2f}s"
+    )
+    simulation.latencies.clear()
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[simulation.run_player(player, args.commands) for player in simulation.players]
+    )
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(latencies) for latencies in simulation.latencies.values())
+    print(
+        f"{total} commands in {elapsed:.2f}s: {total / elapsed:.1f} commands/s, {simulation.errors} errors"
+    )
+    print(
+        f"{'command':>12}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    )
+    for name, latencies in sorted(simulation.latencies.items()):
+        columns = [percentile(latencies, q) for q in [0.5, 0.9, 0.99]]
+        columns.append(max(latencies))
+        print(
+            f"{name:>12}{len(latencies):>8}"
+            f"{''.join(f'{value * 1000:>10.2f}' for value in columns)}"
+        )
+    print(f"peak RSS: {get_peak_rss_mb():.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--games", type=int, default=3, help="open games per player")
+    parser.add_argument("--commands", type=int, default=50, help="commands per player")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start_render_pool()
+    leaderboard.load()
+    try:
+        asyncio.get_event_loop().run_until_complete(run(args))
+    finally:
+        stop_render_pool()
+        _directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
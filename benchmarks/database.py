@@ -0,0 +1,59 @@
+"""Compares game write throughput of SQLite with its stock settings and with the bot's."""
+import argparse
+import datetime
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+os.environ.setdefault("DB_PATH", "sqlite://")  # the benchmark creates its own databases
+
+from sqlalchemy.orm import sessionmaker
+
+from chessbot.database import Base, Game
+from chessbot.database.engine_config import SQLITE_PRAGMAS, create_database_engine
+
+# what a fresh sqlite3 connection uses
+STOCK_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL"}
+
+
+def bench(name: str, pragmas: Dict[str, Any], games: int, moves: int) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine(
+            f"sqlite:///{os.path.join(directory, 'bench.db')}", pragmas
+        )
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+
+        start = time.perf_counter()
+        for _ in range(games):
+            game = Game(expiration_date=datetime.datetime.now())
+            session.add(game)
+            session.commit()
+            for ply in range(moves):
+                # one commit per move, like the bot does
+                game.moves = bytes(2 * (ply + 1))
+                session.commit()
+        elapsed = time.perf_counter() - start
+
+        session.close()
+        engine.dispose()
+
+    commits = games * (moves + 1)
+    print(f"{name:>6}: {commits / elapsed:8.1f} commits/s")
+    return commits / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--moves", type=int, default=20)
+    args = parser.parse_args()
+
+    stock = bench("stock", STOCK_PRAGMAS, args.games, args.moves)
+    tuned = bench("tuned", SQLITE_PRAGMAS, args.games, args.moves)
+    print(f"speedup: {tuned / stock:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measures the built-in engine's search speed (nodes per second) at every strength level."""
+import argparse
+import os
+import random
+import time
+from typing import List
+
+os.environ.setdefault("DB_PATH", "sqlite://")  # the engine doesn't touch the database
+
+import chess
+
+from chessbot.cogs.utils.search_utils import search
+from chessbot.config import ENGINE_LEVELS
+
+
+def random_positions(count: int, seed: int) -> List[str]:
+    # positions from random games that aren't over yet
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(0, 60)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+
+        if not board.is_game_over():
+            positions.append(board.fen())
+
+    return positions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument(
+        "--levels",
+        type=int,
+        nargs="+",
+        default=list(range(1, len(ENGINE_LEVELS) + 1)),
+        help="the levels to search at (default: all of them)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    positions = random_positions(args.positions, args.seed)
+    print(
+        f"{'level':>6}{'depth':>7}{'budget s':>10}{'avg depth':>11}{'s/move':>9}{'nodes/s':>10}"
+    )
+    for level in args.levels:
+        max_depth, move_time = ENGINE_LEVELS[level - 1]
+
+        nodes = depth = 0
+        start = time.perf_counter()
+        for fen in positions:
+            _, stats = search(fen, max_depth, move_time)
+            nodes += stats["nodes"]
+            depth += stats["depth"]
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{level:>6}{max_depth:>7}{move_time:>10.2f}{depth / len(positions):>11.1f}"
+            f"{elapsed / len(positions):>9.3f}{nodes / elapsed:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
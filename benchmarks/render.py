@@ -0,0 +1,74 @@
+"""Compares the cairosvg and the sprite board renderers."""
+import argparse
+import os
+import random
+import time
+from typing import Callable, List
+
+os.environ.setdefault("DB_PATH", "sqlite://")  # the renderers don't touch the database
+
+import chess
+
+from chessbot.cogs.utils.chess_utils import get_render_args, render_png
+from chessbot.cogs.utils.sprite_utils import prepare_sprites, render_png_sprites
+
+
+def random_boards(count: int, seed: int) -> List[chess.Board]:
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(1, 80)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board)
+
+    return boards
+
+
+def bench(
+    name: str,
+    renderer: Callable[..., bytes],
+    boards: List[chess.Board],
+    size: int,
+    theme: str,
+) -> float:
+    args = [get_render_args(board) for board in boards]
+
+    start = time.perf_counter()
+    for render_args in args:
+        renderer(size=size, theme=theme, **render_args)
+    elapsed = time.perf_counter() - start
+
+    per_image = elapsed / len(boards) * 1000
+    print(
+        f"{name:>10}: {per_image:8.2f} ms/image, {len(boards) / elapsed:8.1f} images/s"
+    )
+    return per_image
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--size", type=int, default=400)
+    parser.add_argument("--theme", default="default")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    boards = random_boards(args.images, args.seed)
+
+    start = time.perf_counter()
+    prepare_sprites(args.size, args.theme)
+    print(
+        f"sprite setup: {(time.perf_counter() - start) * 1000:.2f} ms (once per size and theme)"
+    )
+
+    cairosvg_ms = bench("cairosvg", render_png, boards, args.size, args.theme)
+    sprites_ms = bench("sprites", render_png_sprites, boards, args.size, args.theme)
+    print(f"speedup: {cairosvg_ms / sprites_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,82 @@
+import time
 from discord.ext import commands
 from loguru import logger
 from .cogs.chess import Chess
 from .cogs.help import Help
 from .cogs.misc import Misc
-from .config import TOKEN
+from .cogs.utils import (
+    analysis_pool,
+    expiration_scheduler,
+    expire_games,
+    leaderboard,
+    start_render_pool,
+    start_engine_pool,
+)
+from .config import (
+    TOKEN,
+    METRICS_FILE,
+    METRICS_INTERVAL,
+    SHARD_COUNT,
+    SHARD_IDS,
+    RUN_EXPIRATION,
+    EXPIRATION_POLL_INTERVAL,
+)
+from .metrics import metrics, current_command
 
-bot = commands.Bot(command_prefix="/")
+if SHARD_COUNT is not None:
+    bot = commands.AutoShardedBot(
+        command_prefix="/", shard_count=SHARD_COUNT, shard_ids=SHARD_IDS
+    )
+else:
+    bot = commands.Bot(command_prefix="/")
 bot.remove_command("help")  # remove the default !help command
 bot.add_cog(Chess(bot))
 bot.add_cog(Help(bot))
 bot.add_cog(Misc(bot))
 
+_close_bot = bot.close
+
+
+async def close() -> None:
+    # also runs when the bot is stopped with Ctrl+C or SIGTERM, see Client.run
+    await analysis_pool.stop()  # the engine processes would outlive the bot
+    await _close_bot()
+
+
+bot.close = close
+
 
 @bot.event
 async def on_ready() -> None:
     logger.info(f"Logged in as {bot.user}")
 
 
+@bot.before_invoke
+async def start_command_metrics(ctx: commands.Context) -> None:
+    ctx.started_at = time.perf_counter()
+    ctx.command_token = current_command.set(ctx.command.qualified_name)
+    ctx.send = metrics.timed("send", ctx.send)
+
+
+@bot.after_invoke
+async def stop_command_metrics(ctx: commands.Context) -> None:
+    metrics.observe("total", time.perf_counter() - ctx.started_at)
+    current_command.reset(ctx.command_token)
+
+
 def main() -> None:
+    start_render_pool()
+    start_engine_pool()
+
+    leaderboard.load()
+    if RUN_EXPIRATION:
+        expiration_scheduler.load()
+        bot.loop.create_task(
+            expiration_scheduler.run(expire_games, EXPIRATION_POLL_INTERVAL)
+        )
+    else:
+        expiration_scheduler.enabled = False  # another process expires the games
+    if METRICS_FILE is not None:
+        bot.loop.create_task(metrics.run_exporter(METRICS_FILE, METRICS_INTERVAL))
+
     bot.run(TOKEN)
@@ -1,4 +1,9 @@
 from . import main
+from .config import SHARD_COUNT, SHARD_PROCESSES
+from .sharding import launch
 
 if __name__ == "__main__":
-    main()
+    if SHARD_PROCESSES > 1:
+        launch(SHARD_COUNT or SHARD_PROCESSES, SHARD_PROCESSES)
+    else:
+        main()
@@ -1,4 +1,7 @@
+import asyncio
 import traceback
+import chess
+import chess.engine
 import discord
 from discord.ext import commands
 from loguru import logger
@@ -14,9 +17,15 @@ from .utils import (
     handle_action_accept,
     handle_turn_check,
     handle_move,
-    update_ongoing_games,
+    create_game,
+    GameContext,
+    release_game_lock,
+    get_engine_move,
+    analysis_pool,
+    format_score,
 )
 from .. import database, constants
+from ..config import ENGINE_LEVELS, ENGINE_DEFAULT_LEVEL, ANALYSIS_DEPTH
 
 
 class Chess(commands.Cog):
@@ -24,15 +33,25 @@ class Chess(commands.Cog):
         self.bot = bot
 
     async def status_func(
-        self, ctx: commands.Context, game_id: int = None, game: database.Game = None
+        self, ctx: commands.Context, game_id: int = None, game_ctx: GameContext = None
     ) -> None:
-        if game is None:
-            game = await get_game_ctx(ctx, ctx.author.id, game_id)
-            if game is None:  # check the Game object for validity
+        if game_ctx is None:
+            game_ctx = await get_game_ctx(ctx, ctx.author.id, game_id)
+            if game_ctx is None:  # check the Game object for validity
                 return
+        game = game_ctx.game
+
+        # the command's changes are committed before they are reported
+        saved = await database.run_sync(database.commit_session)
+        release_game_lock(ctx)  # the status doesn't need the game locked
+        if not saved:
+            await ctx.send(
+                f"{ctx.author.mention}, failed to save the changes to that game. Please contact the admin."
+            )
+            return
 
         try:
-            status_str, img = get_game_status(self.bot, game)
+            status_str, img = await get_game_status(self.bot, game_ctx)
         except RuntimeError as err:
             await ctx.send(
                 f"{ctx.author.mention}, failed to get the status for that game. Please contact the admin."
@@ -44,6 +63,18 @@ class Chess(commands.Cog):
         logger.info(f"Sent the status for game #{game.id}")
         await ctx.send(status_str, file=img)
 
+    async def engine_move(self, game_ctx: GameContext) -> str:
+        # the bot's reply takes the same path as a player's move
+        board = game_ctx.board
+        move = await get_engine_move(board, game_ctx.game.bot_level)
+        san_move = board.san(move)
+
+        await database.run_sync(handle_move, game_ctx, san_move)
+        await database.run_sync(
+            update_game, game_ctx, recalculate_expiration_date=True, reset_action=True
+        )
+        return san_move
+
     @commands.command()
     async def status(self, ctx: commands.Context, game_id: int = None) -> None:
         logger.info("Got a !status command")
@@ -53,9 +84,10 @@ class Chess(commands.Cog):
     async def accept(self, ctx: commands.Context, game_id: int = None) -> None:
         logger.info("Got an !accept command")
 
-        game = await get_game_ctx(ctx, ctx.author.id, game_id)
-        if game is None:  # check the Game object for validity
+        game_ctx = await get_game_ctx(ctx, ctx.author.id, game_id)
+        if game_ctx is None:  # check the Game object for validity
             return
+        game = game_ctx.game
 
         user = await get_author_user_ctx(ctx)
         if user is None:  # check the User object for validity
@@ -72,7 +104,7 @@ class Chess(commands.Cog):
 
         if game.white_accepted_action != game.black_accepted_action:
             try:
-                handle_action_accept(user, game)
+                await database.run_sync(handle_action_accept, user, game_ctx)
             except RuntimeError as err:
                 logger.error(err)
                 await ctx.send(
@@ -82,7 +114,7 @@ class Chess(commands.Cog):
 
             user.last_game = game
             database.add_to_database(user)
-            await self.status_func(ctx, game=game)
+            await self.status_func(ctx, game_ctx=game_ctx)
         else:
             await ctx.send(
                 f"{ctx.author.mention}, there is nothing to accept for this game."
@@ -95,9 +127,10 @@ class Chess(commands.Cog):
     ) -> None:
         logger.info("Got a !move command")
 
-        game = await get_game_ctx(ctx, ctx.author.id, game_id)
-        if game is None:  # check the Game object for validity
+        game_ctx = await get_game_ctx(ctx, ctx.author.id, game_id)
+        if game_ctx is None:  # check the Game object for validity
             return
+        game = game_ctx.game
 
         if game.winner is not None:  # check that the game hasn't finished yet
             await ctx.send(f"{ctx.author.mention}, the game is over.")
@@ -118,14 +151,14 @@ class Chess(commands.Cog):
             return
 
         try:
-            handle_turn_check(user, game)
+            handle_turn_check(user, game_ctx)
         except RuntimeError as err:
             logger.error(err)
             await ctx.send(f"{ctx.author.mention}, it is not your turn.")
             return
 
         try:
-            handle_move(game, san_move)
+            await database.run_sync(handle_move, game_ctx, san_move)
         except ValueError as err:
             logger.error(err)
             await ctx.send(
@@ -133,10 +166,16 @@ class Chess(commands.Cog):
             )
             return
 
-        update_game(game, recalculate_expiration_date=True, reset_action=True)
+        await database.run_sync(
+            update_game, game_ctx, recalculate_expiration_date=True, reset_action=True
+        )
+        if game.winner is None and game.bot_level is not None:
+            engine_san_move = await self.engine_move(game_ctx)
+            await ctx.send(f"{ctx.author.mention}, I played *{engine_san_move}*.")
+
         user.last_game = game
         database.add_to_database(user)
-        await self.status_func(ctx, game=game)
+        await self.status_func(ctx, game_ctx=game_ctx)
 
     @commands.command()
     async def offer(
@@ -144,9 +183,10 @@ class Chess(commands.Cog):
     ) -> None:
         logger.info("Got an !offer command")
 
-        game = await get_game_ctx(ctx, ctx.author.id, game_id)
-        if game is None:  # check the Game object for validity
+        game_ctx = await get_game_ctx(ctx, ctx.author.id, game_id)
+        if game_ctx is None:  # check the Game object for validity
             return
+        game = game_ctx.game
 
         if game.winner is not None:  # check that the game hasn't finished yet
             await ctx.send(f"{ctx.author.mention}, the game is over.")
@@ -189,7 +229,7 @@ class Chess(commands.Cog):
             return
 
         try:
-            handle_action_offer(user, game, action_type)
+            await database.run_sync(handle_action_offer, user, game_ctx, action_type)
         except RuntimeError as err:
             logger.error(err)
             await ctx.send(
@@ -197,13 +237,27 @@ class Chess(commands.Cog):
             )
             return
 
-        update_game(game)
+        await database.run_sync(update_game, game_ctx)
         user.last_game = game
         database.add_to_database(user)
-        await self.status_func(ctx, game=game)
+        await self.status_func(ctx, game_ctx=game_ctx)
 
     @commands.command()
-    async def play(self, ctx: commands.Context, user: discord.Member) -> None:
+    async def play(
+        self, ctx: commands.Context, user: discord.Member, level: int = None
+    ) -> None:
+        # mentioning this bot starts a game against the built-in engine
+        against_engine = self.bot.user is not None and user.id == self.bot.user.id
+        if level is not None and (
+            not against_engine or level < 1 or level > len(ENGINE_LEVELS)
+        ):
+            logger.error(f"Invalid !play level: {level}")
+            prefix = self.bot.command_prefix
+            await ctx.send(
+                f"{ctx.author.mention}, usage: *{prefix}play {self.bot.user.mention} [level]* (1 ≤ level ≤ {len(ENGINE_LEVELS)})."
+            )
+            return
+
         white = await create_database_user_ctx(ctx, ctx.author)
         black = await create_database_user_ctx(ctx, user)
 
@@ -215,24 +269,83 @@ class Chess(commands.Cog):
             await ctx.send(f"{ctx.author.mention}, you can't play against yourself.")
             return
 
-        game = database.Game(white=white, black=black)
-        database.add_to_database(game)
+        bot_level = (level or ENGINE_DEFAULT_LEVEL) if against_engine else None
+        game = await database.run_sync(create_game, white, black, bot_level)
+        await self.status_func(ctx, game_ctx=GameContext(game))
 
-        white.last_game = game
-        database.add_to_database(white)
+    @commands.command()
+    async def analyze(self, ctx: commands.Context, game_id: int = None) -> None:
+        logger.info("Got an !analyze command")
 
-        black.last_game = game
-        database.add_to_database(black)
+        if not analysis_pool.enabled:
+            await ctx.send(f"{ctx.author.mention}, analysis isn't set up on this bot.")
+            return
 
-        await self.status_func(ctx, game=game)
+        game_ctx = await get_game_ctx(ctx, ctx.author.id, game_id)
+        if game_ctx is None:  # check the Game object for validity
+            return
+        game = game_ctx.game
+
+        # otherwise players could ask the engine for their next move
+        if game.winner is None:
+            logger.error(f"Can't analyze game #{game.id} - the game is still going")
+            await ctx.send(
+                f"{ctx.author.mention}, only finished games can be analyzed."
+            )
+            return
+
+        board = game_ctx.board
+        release_game_lock(ctx)  # the analysis only needs the board
+        # a checkmate or a stalemate has no moves left, so the position before the
+        # final move is analyzed instead, e.g. whether a win was stalemated away
+        final_move = None
+        if board.is_game_over():
+            if not board.move_stack:
+                await ctx.send(
+                    f"{ctx.author.mention}, there are no moves left to analyze in that game."
+                )
+                return
+
+            board = board.copy()  # the board may be cached, see load_board
+            final_move = board.pop()
+
+        try:
+            score, best_move, depth = await analysis_pool.analyse(board, ANALYSIS_DEPTH)
+        # EngineError is a RuntimeError too
+        except (asyncio.TimeoutError, chess.engine.EngineError, OSError) as err:
+            logger.error(f"Failed to analyze game #{game.id}: {err!r}")
+            await ctx.send(
+                f"{ctx.author.mention}, failed to analyze that game. Please contact the admin."
+            )
+            return
+        except RuntimeError as err:
+            logger.warning(err)
+            await ctx.send(
+                f"{ctx.author.mention}, the engine is busy. Please, try again later."
+            )
+            return
+
+        if final_move is None:
+            position = "the final position"
+        else:
+            position = f"the position before the final move *{board.san(final_move)}*"
+        output = (
+            f"{ctx.author.mention}, the evaluation of {position} of game #{game.id}: "
+            f"*{format_score(score)}* (depth {depth})"
+        )
+        if best_move is not None:
+            san_move = board.san(chess.Move.from_uci(best_move))
+            output = f"{output}, the best move is *{san_move}*"
+        await ctx.send(f"{output}.")
 
     @commands.command()
     async def concede(self, ctx: commands.Context, game_id: int = None) -> None:
         logger.info("Got a !concede command")
 
-        game = await get_game_ctx(ctx, ctx.author.id, game_id)
-        if game is None:  # check the Game object for validity
+        game_ctx = await get_game_ctx(ctx, ctx.author.id, game_id)
+        if game_ctx is None:  # check the Game object for validity
             return
+        game = game_ctx.game
 
         if game.winner is not None:  # check that the game hasn't finished yet
             await ctx.send(f"{ctx.author.mention}, the game is over.")
@@ -252,14 +365,22 @@ class Chess(commands.Cog):
             await ctx.send(f"{ctx.author.mention}, you can't play this game.")
             return
 
-        update_game(game, concede_side=which_player(game, user))
+        await database.run_sync(
+            update_game, game_ctx, concede_side=which_player(game, user)
+        )
         user.last_game = game
         database.add_to_database(user)
-        await self.status_func(ctx, game=game)
+        await self.status_func(ctx, game_ctx=game_ctx)
 
     async def cog_before_invoke(self, ctx: commands.Context) -> None:
-        logger.info("Updating all ongoing games")
-        update_ongoing_games()
+        ctx.session_token = database.open_session_scope()
+
+    async def cog_after_invoke(self, ctx: commands.Context) -> None:
+        try:
+            await database.run_sync(database.end_transaction, not ctx.command_failed)
+        finally:
+            release_game_lock(ctx)
+            database.close_session_scope(ctx.session_token)
 
     async def cog_command_error(
         self, ctx: commands.Context, error: commands.CommandError
@@ -2,6 +2,8 @@ import discord
 from discord.ext import commands
 from loguru import logger
 
+from ..config import ENGINE_LEVELS, ENGINE_DEFAULT_LEVEL
+
 
 class Help(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
@@ -27,6 +29,11 @@ class Help(commands.Cog):
             value="Starts a game with @someone.",
             inline=False,
         )
+        embed.add_field(
+            name=f"{prefix}play @{self.bot.user.name if self.bot.user else 'ChessBot'} [level]",
+            value=f"Starts a game against the bot (1 ≤ level ≤ {len(ENGINE_LEVELS)}, {ENGINE_DEFAULT_LEVEL} by default).",
+            inline=False,
+        )
         embed.add_field(
             name=f"{prefix}move (SAN move) [Game ID]",
             value="Moves a piece according to the standard algebraic notation in the game.",
@@ -53,10 +60,29 @@ class Help(commands.Cog):
             inline=False,
         )
         embed.add_field(
-            name=f"{prefix}games [*all*]", value="Shows your games.", inline=False
+            name=f"{prefix}analyze [Game ID]",
+            value="Evaluates the final position of a finished game with a chess engine, or the one before a checkmate or a stalemate.",
+            inline=False,
+        )
+        embed.add_field(
+            name=f"{prefix}games [*all*|*finished*] [before:*Game ID*] [@opponent] [from:*YYYY-MM-DD*] [to:*YYYY-MM-DD*]",
+            value="Shows your games, newest first, 10 at a time. The command at the end of the list shows the older ones.",
+            inline=False,
         )
         embed.add_field(
-            name=f"{prefix}elo", value="Shows your elo rating.", inline=False
+            name=f"{prefix}elo [*history*] [N]",
+            value="Shows your elo rating, or a chart of it over your last N games (1 ≤ N ≤ 100).",
+            inline=False,
+        )
+        embed.add_field(
+            name=f"{prefix}position (FEN)",
+            value="Shows the latest games that reached the position.",
+            inline=False,
+        )
+        embed.add_field(
+            name=f"{prefix}export [*all*|*mine*] [*gz*]",
+            value="Sends your games (or all games) as a PGN file, gzip-compressed with *gz*.",
+            inline=False,
         )
         embed.add_field(
             name=f"{prefix}leaderboard [Top *N*]",
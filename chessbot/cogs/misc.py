@@ -1,6 +1,23 @@
+import tempfile
 import traceback
+import chess
+import discord
 from discord.ext import commands
-from .utils import get_author_user_ctx, get_vs_line, update_ongoing_games
+from .utils import (
+    get_author_user_ctx,
+    get_vs_line,
+    get_user_games,
+    parse_games_args,
+    leaderboard,
+    get_rating_history,
+    render_chart,
+    image_cache,
+    export_games,
+    EXPORT_MAX_BYTES,
+    find_games_by_position,
+    get_ply_name,
+)
+from ..metrics import metrics
 from .. import database
 
 from loguru import logger
@@ -11,16 +28,31 @@ class Misc(commands.Cog):
         self.bot = bot
 
     @commands.command()
-    async def games(self, ctx: commands.Context, all: str = "") -> None:
+    async def games(self, ctx: commands.Context, *args: str) -> None:
         logger.info("Got a !games command")
 
+        try:
+            filters = parse_games_args(args)
+        except ValueError as err:
+            logger.error(err)
+            await ctx.send(
+                f"{ctx.author.mention}, usage: *{self.bot.command_prefix}games [all|finished] [before:<game id>] "
+                "[@opponent] [from:YYYY-MM-DD] [to:YYYY-MM-DD]*."
+            )
+            return
+
         user = await get_author_user_ctx(ctx)
         if user is None:  # check the User object for validity
             return
 
-        games = user.ongoing_games
-        if all.lower() == "all":
-            games = [*games, *user.finished_games]
+        try:
+            games, next_before_id = await database.run_sync(
+                get_user_games, user, **filters
+            )
+        except RuntimeError as err:
+            logger.error(err)
+            await ctx.send(f"{ctx.author.mention}, couldn't find that opponent.")
+            return
 
         outputs = []
         for game in games:
@@ -35,12 +67,29 @@ class Misc(commands.Cog):
             output = f"{ctx.author.mention}, you don't have any games."
         else:
             output = f"{ctx.author.mention}, your games:\n\n{output}"
+
+        if next_before_id is not None:
+            # the same filters, but the games before the last one shown
+            next_args = [arg for arg in args if not arg.lower().startswith("before:")]
+            next_command = " ".join(["games", *next_args, f"before:{next_before_id}"])
+            output = (
+                f"{output}\n\nMore games: *{self.bot.command_prefix}{next_command}*"
+            )
         await ctx.send(output)
 
     @commands.command()
-    async def elo(self, ctx: commands.Context) -> None:
+    async def elo(
+        self, ctx: commands.Context, history: str = "", count: int = 20
+    ) -> None:
         logger.info("Got an !elo command")
 
+        if history.lower() not in ["", "history"] or count < 1 or count > 100:
+            logger.error(f"Invalid !elo arguments: {history} {count}")
+            await ctx.send(
+                f"{ctx.author.mention}, usage: *{self.bot.command_prefix}elo [history] [N]* (1 ≤ N ≤ 100)."
+            )
+            return
+
         user = await get_author_user_ctx(ctx)
         if user is None:  # check the User object for validity
             return
@@ -51,9 +100,23 @@ class Misc(commands.Cog):
             )
             return
 
-        await ctx.send(
-            f"{ctx.author.mention}, your current elo rating is *{user.elo}*."
+        if history.lower() != "history":
+            await ctx.send(
+                f"{ctx.author.mention}, your current elo rating is *{user.elo}*."
+            )
+            return
+
+        changes = await database.run_sync(get_rating_history, user, count)
+        if not changes:
+            await ctx.send(f"{ctx.author.mention}, you haven't finished any games yet.")
+            return
+
+        ratings = [changes[0].elo_before, *[change.elo_after for change in changes]]
+        output = (
+            f"{ctx.author.mention}, your elo rating over the last {len(changes)} games: "
+            f"*{ratings[0]:.0f}* → *{ratings[-1]:.0f}* ({ratings[-1] - ratings[0]:+.0f})."
         )
+        await ctx.send(output, file=await render_chart(ratings))
 
     @commands.command()
     async def leaderboard(self, ctx: commands.Context, top: int = 10) -> None:
@@ -66,27 +129,121 @@ class Misc(commands.Cog):
             )
             return
 
-        outputs = []
-        users = (
-            database.session.query(database.User)
-            .order_by(database.User.elo.desc())
-            .limit(top)
-        )
-        for i, user in enumerate(users):
-            username = user.username or user.discord_id
-            user_output = f"**[{i + 1}]** {username} - {user.elo} elo."
-            outputs.append(user_output)
+        if leaderboard.stale:
+            await database.run_sync(leaderboard.load)
 
-        output = "\n".join(outputs)
-        if output == "":
+        output = leaderboard.get_message(top)
+        if output is None:
             output = f"{ctx.author.mention}, there aren't any players in the leaderboard yet."
+        await ctx.send(output)
+
+    @commands.command()
+    async def position(self, ctx: commands.Context, *, fen: str = "") -> None:
+        logger.info("Got a !position command")
+
+        try:
+            board = chess.Board(fen.strip("` "))
+        except ValueError as err:
+            logger.error(f"Invalid FEN in !position: {fen} ({err})")
+            await ctx.send(
+                f"{ctx.author.mention}, usage: *{self.bot.command_prefix}position (FEN)*."
+            )
+            return
+
+        games = await database.run_sync(find_games_by_position, board)
+
+        outputs = []
+        for game, ply in games:
+            vs_line = get_vs_line(self.bot, game)
+            outputs.append(f"**[{game.id}]** {vs_line}\t*{get_ply_name(ply)}*.")
+
+        if not outputs:
+            output = f"{ctx.author.mention}, no games have reached that position."
         else:
-            output = f"__Global leaderboard:__\n\n{output}"
+            output = "\n".join(outputs)
+            output = f"{ctx.author.mention}, the latest games that reached that position:\n\n{output}"
         await ctx.send(output)
 
+    @commands.command()
+    async def export(
+        self, ctx: commands.Context, scope: str = "mine", compression: str = ""
+    ) -> None:
+        logger.info("Got an !export command")
+
+        if scope.lower() not in ["all", "mine"] or compression.lower() not in [
+            "",
+            "gz",
+        ]:
+            logger.error(f"Invalid !export arguments: {scope} {compression}")
+            await ctx.send(
+                f"{ctx.author.mention}, usage: *{self.bot.command_prefix}export [all|mine] [gz]*."
+            )
+            return
+
+        user = None
+        if scope.lower() == "mine":
+            user = await get_author_user_ctx(ctx)
+            if user is None:  # check the User object for validity
+                return
+
+        compress = compression.lower() == "gz"
+        # the games are streamed into a temporary file instead of memory
+        with tempfile.TemporaryFile() as file:
+            try:
+                count = await database.run_sync(
+                    export_games, file, user, compress, EXPORT_MAX_BYTES
+                )
+            except RuntimeError as err:
+                logger.error(err)
+                await ctx.send(
+                    f"{ctx.author.mention}, the export is too large for Discord. Try *gz*, or ask the admin to export the games."
+                )
+                return
+
+            if count == 0:
+                await ctx.send(
+                    f"{ctx.author.mention}, there aren't any games to export."
+                )
+                return
+
+            file.seek(0)
+            filename = "games.pgn.gz" if compress else "games.pgn"
+            await ctx.send(
+                f"{ctx.author.mention}, {count} games:",
+                file=discord.File(file, filename=filename),
+            )
+
+    @commands.command()
+    @commands.is_owner()
+    async def stats(self, ctx: commands.Context) -> None:
+        logger.info("Got a !stats command")
+
+        lines = [f"{'command':<12}{'phase':<9}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}"]
+        for command, phase, histogram in metrics.snapshot():
+            lines.append(
+                f"{command:<12}{phase:<9}{histogram.count:>8}"
+                f"{histogram.quantile(0.5) * 1000:>10.1f}{histogram.quantile(0.99) * 1000:>10.1f}"
+            )
+
+        cache = image_cache.stats()
+        lines.append(
+            f"\nimage cache: {cache['memory_hits']} memory hits, {cache['disk_hits']} disk hits, "
+            f"{cache['misses']} misses, {cache['images']} images ({cache['bytes'] // 1024} KiB)"
+        )
+
+        output = "\n".join(lines)
+        if len(output) > 1900:  # Discord's message limit is 2000 characters
+            output = output[:1900] + "\n..."
+        await ctx.send(f"```\n{output}\n```")
+
     async def cog_before_invoke(self, ctx: commands.Context) -> None:
-        logger.info("Updating all ongoing games")
-        update_ongoing_games()
+        ctx.session_token = database.open_session_scope()
+
+    async def cog_after_invoke(self, ctx: commands.Context) -> None:
+        try:
+            await database.run_sync(database.end_transaction, not ctx.command_failed)
+        finally:
+            database.close_session_scope(ctx.session_token)
 
     async def cog_command_error(
         self, ctx: commands.Context, error: commands.CommandError
@@ -1,7 +1,15 @@
 from .chess_utils import *
+from .image_cache_utils import *
+from .render_utils import *
+from .engine_utils import *
+from .analysis_utils import *
 from .elo_utils import *
+from .leaderboard_utils import *
+from .position_utils import *
 from .user_utils import *
 from .game_utils import *
+from .lock_utils import *
+from .export_utils import *
 
 from .status_utils import *
 from .move_utils import *
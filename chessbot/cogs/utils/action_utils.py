@@ -1,8 +1,11 @@
-from .game_utils import which_player, update_game
+from .game_utils import GameContext, which_player, update_game
 from ... import database, constants
 
 
-def handle_action_offer(user: database.User, game: database.Game, action: int) -> None:
+def handle_action_offer(
+    user: database.User, game_ctx: GameContext, action: int
+) -> None:
+    game = game_ctx.game
     if action not in [
         constants.ACTION_NONE,
         constants.ACTION_DRAW,
@@ -24,7 +27,8 @@ def handle_action_offer(user: database.User, game: database.Game, action: int) -
     database.add_to_database(game)
 
 
-def handle_action_accept(user: database.User, game: database.Game) -> None:
+def handle_action_accept(user: database.User, game_ctx: GameContext) -> None:
+    game = game_ctx.game
     if (game.white_accepted_action and game.white == user) or (
         game.black_accepted_action and game.black == user
     ):
@@ -34,4 +38,4 @@ def handle_action_accept(user: database.User, game: database.Game) -> None:
     elif game.black == user:
         game.black_accepted_action = True
 
-    update_game(game, reset_action=True)
+    update_game(game_ctx, reset_action=True)
@@ -0,0 +1,192 @@
+import asyncio
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import chess
+import chess.engine
+from loguru import logger
+
+from ...config import (
+    UCI_ENGINE_PATH,
+    UCI_ENGINE_PROCESSES,
+    UCI_ENGINE_HASH,
+    UCI_ENGINE_THREADS,
+    ANALYSIS_QUEUE_SIZE,
+    ANALYSIS_CACHE_SIZE,
+    ANALYSIS_TIMEOUT,
+)
+from ...metrics import metrics
+
+# (score from white's point of view, the best move in UCI or None, depth reached)
+Evaluation = Tuple[chess.engine.Score, Optional[str], int]
+
+
+def format_score(score: chess.engine.Score) -> str:
+    if score.is_mate():
+        return f"#{score.mate()}"  # mate in that many moves, negative if black mates
+
+    return f"{score.score() / 100:+.2f}"
+
+
+class AnalysisPool:
+    # long-lived UCI engine processes, started on the first analysis.
+    # Evaluations are cached by position and depth, least recently used first.
+    def __init__(self) -> None:
+        self._engines: List[chess.engine.UciProtocol] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._waiting = 0  # analyses waiting for an idle engine or running
+        self._cache: "OrderedDict[Tuple[str, int], Evaluation]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return UCI_ENGINE_PATH is not None
+
+    @property
+    def saturated(self) -> bool:
+        return self._waiting >= ANALYSIS_QUEUE_SIZE
+
+    async def _open_engine(self) -> chess.engine.UciProtocol:
+        _, engine = await chess.engine.popen_uci(UCI_ENGINE_PATH)
+        options = {"Hash": UCI_ENGINE_HASH, "Threads": UCI_ENGINE_THREADS}
+        await engine.configure(
+            {name: value for name, value in options.items() if name in engine.options}
+        )
+        return engine
+
+    async def start(self) -> None:
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if self._idle is not None:
+                return  # already started
+
+            idle: asyncio.Queue = asyncio.Queue()
+            try:
+                for _ in range(UCI_ENGINE_PROCESSES):
+                    engine = await self._open_engine()
+                    self._engines.append(engine)
+                    idle.put_nowait(engine)
+            except (OSError, chess.engine.EngineError):
+                await self.stop()  # the next analysis tries again
+                raise
+
+            self._idle = idle
+            logger.info(
+                f"Started {UCI_ENGINE_PROCESSES} UCI engines ({UCI_ENGINE_PATH}, "
+                f"{UCI_ENGINE_HASH} MB hash, {UCI_ENGINE_THREADS} threads)"
+            )
+
+    async def stop(self) -> None:
+        engines, self._engines = self._engines, []
+        self._close_queue()
+        for engine in engines:
+            try:
+                await engine.quit()
+            except chess.engine.EngineError as err:
+                logger.error(err)
+
+    def _close_queue(self) -> None:
+        # the analyses waiting for an engine fail at once instead of when they time
+        # out, each one wakes the next (see _analyse)
+        if self._idle is not None:
+            self._idle.put_nowait(None)
+            self._idle = None
+
+    def _get_cached(self, key: Tuple[str, int]) -> Optional[Evaluation]:
+        evaluation = self._cache.get(key)
+        if evaluation is not None:
+            self._cache.move_to_end(key)
+
+        return evaluation
+
+    def _cache_evaluation(self, key: Tuple[str, int], evaluation: Evaluation) -> None:
+        self._cache[key] = evaluation
+        self._cache.move_to_end(key)
+        while len(self._cache) > ANALYSIS_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def _replace_engine(
+        self, engine: chess.engine.UciProtocol, idle: asyncio.Queue
+    ) -> None:
+        # e.g. after the engine process crashed. The pool may be stopped (and
+        # started again) while the new engine starts, idle is the queue it came from.
+        if self._idle is not idle:
+            return
+
+        self._engines.remove(engine)
+        try:
+            engine = await self._open_engine()
+        except (OSError, chess.engine.EngineError) as err:
+            logger.error(f"Failed to restart a UCI engine: {err}")
+            if not self._engines and self._idle is idle:
+                self._close_queue()  # none are left, the next analysis starts them again
+            return
+
+        if self._idle is not idle:
+            await engine.quit()
+            return
+
+        self._engines.append(engine)
+        idle.put_nowait(engine)
+
+    def _release_engine(
+        self, engine: chess.engine.UciProtocol, idle: asyncio.Queue
+    ) -> None:
+        if self._idle is idle:
+            idle.put_nowait(engine)  # otherwise the pool stopped and quit it
+
+    async def analyse(self, board: chess.Board, depth: int) -> Evaluation:
+        # the FEN without the move counters, so that transpositions share the evaluation
+        key = (board.epd(), depth)
+        evaluation = self._get_cached(key)
+        if evaluation is not None:
+            return evaluation
+
+        if self.saturated:
+            raise RuntimeError("Too many analyses are waiting for an engine")
+
+        self._waiting += 1
+        try:
+            await self.start()
+            with metrics.timer("analysis"):
+                evaluation = await asyncio.wait_for(
+                    self._analyse(board, depth), timeout=ANALYSIS_TIMEOUT
+                )
+        finally:
+            self._waiting -= 1
+
+        self._cache_evaluation(key, evaluation)
+        return evaluation
+
+    async def _analyse(self, board: chess.Board, depth: int) -> Evaluation:
+        idle = self._idle
+        engine = None
+        if idle is not None:
+            engine = await idle.get()
+            if engine is None:
+                idle.put_nowait(None)  # wakes the next analysis waiting on it
+        if idle is None or engine is None:
+            # every engine died (or the pool stopped) after this analysis started them
+            raise chess.engine.EngineTerminatedError("The UCI engines aren't running")
+
+        try:
+            info = await engine.analyse(board, chess.engine.Limit(depth=depth))
+        except chess.engine.EngineTerminatedError:
+            await self._replace_engine(engine, idle)
+            raise
+        except BaseException:
+            self._release_engine(engine, idle)  # also on timeouts, it was stopped
+            raise
+
+        self._release_engine(engine, idle)
+        pv = info.get("pv")
+        return (
+            info["score"].white(),
+            pv[0].uci() if pv else None,
+            info.get("depth", depth),
+        )
+
+
+analysis_pool = AnalysisPool()
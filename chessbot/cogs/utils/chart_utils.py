@@ -0,0 +1,62 @@
+import io
+from typing import List
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .chess_utils import BOARD_THEMES
+
+
+def render_rating_chart(
+    ratings: List[float], width: int = 600, height: int = 240, theme: str = "default"
+) -> bytes:
+    colors = BOARD_THEMES.get(theme)
+    if colors is None:
+        raise RuntimeError(f'Unknown board theme "{theme}"')
+    if len(ratings) < 2:
+        raise RuntimeError("A rating chart needs at least two ratings")
+
+    image = Image.new("RGB", (width, height), colors["square light"])
+    draw = ImageDraw.Draw(image)
+
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", max(1, height // 16))
+    except OSError:
+        font = ImageFont.load_default()
+
+    low, high = min(ratings), max(ratings)
+    if high - low < 1:
+        low, high = low - 1, high + 1  # a flat line in the middle
+
+    labels = [f"{high:.0f}", f"{low:.0f}"]
+    label_width = max(draw.textbbox((0, 0), label, font=font)[2] for label in labels)
+    margin = height // 12
+    left, right = 2 * margin + label_width, width - margin
+    top, bottom = margin, height - margin
+
+    draw.text((margin, top), labels[0], fill=colors["square dark"], font=font)
+    low_label_height = draw.textbbox((0, 0), labels[1], font=font)[3]
+    draw.text(
+        (margin, bottom - low_label_height),
+        labels[1],
+        fill=colors["square dark"],
+        font=font,
+    )
+    draw.line(
+        [(left, top), (left, bottom), (right, bottom)], fill=colors["square dark"]
+    )
+
+    step = (right - left) / (len(ratings) - 1)
+    points = [
+        (left + i * step, bottom - (rating - low) / (high - low) * (bottom - top))
+        for i, rating in enumerate(ratings)
+    ]
+    line_color = colors["square dark lastmove"]
+    draw.line(points, fill=line_color, width=max(1, height // 80), joint="curve")
+
+    radius = max(2, height // 60)
+    x, y = points[-1]  # the current rating
+    draw.ellipse([x - radius, y - radius, x + radius, y + radius], fill=line_color)
+
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
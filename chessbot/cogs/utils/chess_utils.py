@@ -5,10 +5,91 @@ import chess.svg
 import discord
 
 import io
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from cairosvg import svg2png
 from loguru import logger
 
-from ... import constants
+from ... import constants, database
+from ...config import BOARD_CACHE_SIZE
+from ...database.move_encoding import encode_moves, decode_moves, get_ply, split_history
+
+# square colors, with the same keys as chess.svg.DEFAULT_COLORS
+BOARD_THEMES = {
+    "default": chess.svg.DEFAULT_COLORS,
+    "green": {
+        "square light": "#eeeed2",
+        "square dark": "#769656",
+        "square dark lastmove": "#baca2b",
+        "square light lastmove": "#f6f669",
+    },
+    "blue": {
+        "square light": "#dee3e6",
+        "square dark": "#8ca2ad",
+        "square dark lastmove": "#aaa23b",
+        "square light lastmove": "#cdd16a",
+    },
+}
+
+# game id -> (hash of the game's encoded moves, board), least recently used first
+_board_cache: "OrderedDict[int, Tuple[int, chess.Board]]" = OrderedDict()
+_board_cache_lock = threading.Lock()  # boards are loaded from the database threads
+
+
+def _cache_board(game_id: int, moves: bytes, board: chess.Board) -> None:
+    board = board.copy()
+    with _board_cache_lock:
+        _board_cache[game_id] = (hash(moves), board)
+        _board_cache.move_to_end(game_id)
+
+        while len(_board_cache) > BOARD_CACHE_SIZE:
+            _board_cache.popitem(last=False)
+
+
+def _get_cached_board(game_id: int, moves: bytes) -> Optional[chess.Board]:
+    with _board_cache_lock:
+        cached = _board_cache.get(game_id)
+        if cached is None or cached[0] != hash(moves):
+            return None
+
+        _board_cache.move_to_end(game_id)
+        return cached[1].copy()  # callers are free to mutate the returned board
+
+
+def load_board(game: database.Game, full_history: bool = False) -> chess.Board:
+    if full_history:
+        board = chess.Board()
+        for move in decode_moves(game.moves):
+            board.push(move)
+
+        return board
+
+    board = _get_cached_board(game.id, game.moves)
+    if board is not None:
+        return board
+
+    # only the moves since the last irreversible one are replayed,
+    # so loading a long game costs about the same as loading a short one
+    history_start = 2 * game.history_ply
+    board = chess.Board(game.history_fen)
+    for move in decode_moves(game.moves[history_start:]):
+        board.push(move)
+
+    _cache_board(game.id, game.moves, board)
+    return board
+
+
+def save_board(game: database.Game, board: chess.Board) -> None:
+    # the board may only hold the last moves of the game, the rest are kept as is
+    first_ply = get_ply(board) - len(board.move_stack)
+    game.moves = (game.moves or b"")[: 2 * first_ply] + encode_moves(board.move_stack)
+
+    game.fen = board.fen()
+    game.history_fen, game.history_ply = split_history(board)
+    game.turn = get_turn(board)
+
+    _cache_board(game.id, game.moves, board)  # the next load of this game is a hit
 
 
 def load_from_pgn(pgn_str: str) -> chess.Board:
@@ -20,9 +101,14 @@ def load_from_pgn(pgn_str: str) -> chess.Board:
     return board
 
 
-def save_to_pgn(board: chess.Board) -> str:
+def save_to_pgn(board: chess.Board, headers: Dict[str, str] = None) -> str:
     game = chess.pgn.Game.from_board(board)
-    exporter = chess.pgn.StringExporter(headers=False, variations=False, comments=False)
+    if headers is not None:
+        game.headers.update(headers)
+
+    exporter = chess.pgn.StringExporter(
+        headers=headers is not None, variations=False, comments=False
+    )
     return game.accept(exporter)
 
 
@@ -43,12 +129,11 @@ def undo(board: chess.Board) -> None:
         logger.error("Can't undo the last move")
 
 
-def to_png(board: chess.Board, size: int = 400) -> discord.File:
-    args = {"size": size}
+def get_render_args(board: chess.Board) -> Dict[str, Any]:
+    args = {"fen": board.fen(), "lastmove": None, "check": None}
 
     try:
-        lastmove = board.peek()
-        args["lastmove"] = lastmove
+        args["lastmove"] = board.peek().uci()
 
         if board.is_check():
             args["check"] = board.king(board.turn)
@@ -56,9 +141,40 @@ def to_png(board: chess.Board, size: int = 400) -> discord.File:
         logger.info("No last move in this board, skipping")
         pass
 
-    svg_image = chess.svg.board(board, **args)
+    return args
+
+
+def get_theme_style(theme: str) -> str:
+    colors = BOARD_THEMES.get(theme)
+    if colors is None:
+        raise RuntimeError(f'Unknown board theme "{theme}"')
+
+    return " ".join(
+        f".{name.replace(' ', '.')} {{ fill: {color}; }}"
+        for name, color in colors.items()
+    )
+
+
+def render_png(
+    fen: str,
+    lastmove: str = None,
+    check: int = None,
+    size: int = 400,
+    theme: str = "default",
+) -> bytes:
+    svg_image = chess.svg.board(
+        chess.Board(fen),
+        lastmove=chess.Move.from_uci(lastmove) if lastmove is not None else None,
+        check=check,
+        size=size,
+        style=get_theme_style(theme),
+    )
+
+    return svg2png(bytestring=svg_image.encode("UTF-8"))
+
 
-    png = svg2png(bytestring=svg_image.encode("UTF-8"))
+def to_png(board: chess.Board, size: int = 400, theme: str = "default") -> discord.File:
+    png = render_png(size=size, theme=theme, **get_render_args(board))
     return discord.File(io.BytesIO(png), filename="board.png")
 
 
@@ -2,16 +2,40 @@ import discord
 from discord.ext import commands
 from loguru import logger
 
-from .game_utils import get_game, update_game
+from .game_utils import GameContext, get_game, get_last_game_id, update_game
+from .lock_utils import get_game_lock
 from .user_utils import get_database_user, create_database_user
 from ... import database
 
 
+async def lock_game(ctx: commands.Context, game_id: int) -> None:
+    # commands on the same game run one after another, from reading the game
+    # until its changes are committed (see release_game_lock)
+    if getattr(ctx, "game_lock", None) is not None:
+        return
+
+    lock = get_game_lock(game_id)
+    await lock.acquire()
+    ctx.game_lock = lock
+
+
+def release_game_lock(ctx: commands.Context) -> None:
+    lock = getattr(ctx, "game_lock", None)
+    if lock is not None:
+        ctx.game_lock = None
+        lock.release()
+
+
 async def get_game_ctx(
     ctx: commands.Context, user_id: int, game_id: int
-) -> database.Game:
+) -> GameContext:
     try:
-        game = get_game(user_id, game_id)
+        locked_id = game_id
+        if locked_id is None:
+            locked_id = await database.run_sync(get_last_game_id, user_id)
+        await lock_game(ctx, locked_id)
+
+        game = await database.run_sync(get_game, user_id, locked_id)
     except RuntimeError as err:
         if game_id is None:
             await ctx.send(f"{ctx.author.mention}, you don't have a last game.")
@@ -23,13 +47,16 @@ async def get_game_ctx(
 
     logger.info(f"Got a game - {game}")
 
-    update_game(game)
-    return game
+    game_ctx = GameContext(game)
+    # every command that changes the board updates the game afterwards,
+    # so only the expiration can have changed since then
+    await database.run_sync(update_game, game_ctx, only_check_expiration=True)
+    return game_ctx
 
 
 async def get_author_user_ctx(ctx: commands.Context) -> database.User:
     try:
-        user = get_database_user(ctx.author.id)
+        user = await database.run_sync(get_database_user, ctx.author.id)
         return user
     except RuntimeError as err:
         logger.error(err)
@@ -43,12 +70,12 @@ async def create_database_user_ctx(
     ctx: commands.Context, discord_user: discord.User
 ) -> database.User:
     try:
-        database_user = create_database_user(discord_user)
+        database_user = await database.run_sync(create_database_user, discord_user)
     except RuntimeError as err:
         logger.info(err)  # not an error, the user already exists
 
         try:
-            database_user = get_database_user(discord_user.id)
+            database_user = await database.run_sync(get_database_user, discord_user.id)
         except RuntimeError as err:
             logger.error(err)
             await ctx.send(
@@ -1,6 +1,39 @@
+from typing import List
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .leaderboard_utils import leaderboard
 from ... import database, constants
 
 
+ELO_ATTEMPTS = 3  # tries at rating a game while other games change the ratings
+
+
+def _set_elo(user: database.User, elo: float) -> bool:
+    # only updates the rating if nobody changed it since it was read, e.g. another
+    # bot process finishing a game of the same player at once
+    updated = (
+        database.session.query(database.User)
+        .filter(database.User.id == user.id, database.User.elo == user.elo)
+        .update({database.User.elo: elo}, synchronize_session=False)
+    )
+    if updated != 1:
+        return False
+
+    set_committed_value(user, "elo", elo)  # already written
+    return True
+
+
+def _reload_elo(*users: database.User) -> None:
+    for user in users:
+        elo = (
+            database.session.query(database.User.elo)
+            .filter(database.User.id == user.id)
+            .scalar()
+        )
+        set_committed_value(user, "elo", elo)
+
+
 def recalculate_elo(game: database.Game) -> None:
     if game is None:
         raise RuntimeError("Game is None")
@@ -15,22 +48,49 @@ def recalculate_elo(game: database.Game) -> None:
         raise RuntimeError("Either white or black is None")
     if white.elo is None or black.elo is None:
         raise RuntimeError("Either white or black does not have an elo rating")
+    if white.is_bot or black.is_bot:
+        return  # games against bots are unrated
 
-    WEa = round(1 / (1 + 10 ** ((black.elo - white.elo) / 400)), 2)
     white_actual = constants.result_to_int(game_result)
+    for _ in range(ELO_ATTEMPTS):
+        white_before, black_before = white.elo, black.elo
+        WEa = round(1 / (1 + 10 ** ((black.elo - white.elo) / 400)), 2)
+        white_delta = white_actual - WEa
+
+        white_diff = white_delta * constants.ELO_K
+        black_diff = (-white_delta) * constants.ELO_K
+
+        if _set_elo(white, max(white.elo + white_diff, 0)):
+            if _set_elo(black, max(black.elo + black_diff, 0)):
+                break
+            _set_elo(white, white_before)  # rated again with the new ratings
+
+        # the ratings are read again in the same transaction, instead of failing
+        # the move (or /concede) that finished the game
+        _reload_elo(white, black)
+    else:
+        raise RuntimeError(
+            f"The elo ratings of users #{white.discord_id} and #{black.discord_id} kept changing"
+        )
 
-    white_delta = white_actual - WEa
+    leaderboard.stage(white, black)
 
-    white_diff = white_delta * constants.ELO_K
-    black_diff = (-white_delta) * constants.ELO_K
+    # committed together with the new ratings
+    for user, elo_before in [(white, white_before), (black, black_before)]:
+        database.add_to_database(
+            database.RatingChange(
+                user=user, game=game, elo_before=elo_before, elo_after=user.elo
+            )
+        )
 
-    white.elo += white_diff
-    black.elo += black_diff
 
-    if white.elo < 0:
-        white.elo = 0
-    if black.elo < 0:
-        black.elo = 0
+def get_rating_history(user: database.User, count: int) -> List[database.RatingChange]:
+    changes = (
+        database.session.query(database.RatingChange)
+        .filter(database.RatingChange.user_id == user.id)
+        .order_by(database.RatingChange.date.desc(), database.RatingChange.id.desc())
+        .limit(count)
+        .all()
+    )
 
-    database.add_to_database(white)
-    database.add_to_database(black)
+    return changes[::-1]  # oldest first
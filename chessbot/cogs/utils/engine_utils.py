@@ -0,0 +1,69 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import chess
+from loguru import logger
+
+from .pool_utils import PoolQueue, PoolSaturated, submit_bounded
+from .search_utils import search
+from ...config import ENGINE_PROCESSES, ENGINE_QUEUE_SIZE, ENGINE_LEVELS
+
+ENGINE_TIMEOUT_MARGIN = 5  # seconds on top of the time per move before giving up
+
+_executor: Optional[ProcessPoolExecutor] = None
+_queue = PoolQueue("engine", ENGINE_QUEUE_SIZE)
+
+
+def start_engine_pool() -> None:
+    global _executor
+
+    if ENGINE_PROCESSES > 0 and _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=ENGINE_PROCESSES)
+        logger.info(f"Started an engine pool with {ENGINE_PROCESSES} processes")
+
+
+def stop_engine_pool() -> None:
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _quick_search(fen: str) -> str:
+    # when the pool can't take the search, a one ply search in the bot process
+    # still answers in a few milliseconds
+    uci, _ = search(fen, 1, 0)
+    return uci
+
+
+async def get_engine_move(board: chess.Board, level: int) -> chess.Move:
+    if level < 1 or level > len(ENGINE_LEVELS):
+        raise RuntimeError(f"Unknown engine level {level}")
+    max_depth, move_time = ENGINE_LEVELS[level - 1]
+    fen = board.fen()
+
+    # without a pool the search runs in a thread, though the other commands are
+    # slower meanwhile
+    try:
+        uci, stats = await submit_bounded(
+            _executor,
+            _queue,
+            search,
+            fen,
+            max_depth,
+            move_time,
+            timeout=move_time + ENGINE_TIMEOUT_MARGIN,
+        )
+    except PoolSaturated:
+        logger.warning("The engine pool is saturated, playing a one ply search")
+        return chess.Move.from_uci(_quick_search(fen))
+    except asyncio.TimeoutError:
+        logger.error(f"Searching {fen} took longer than {move_time}s")
+        return chess.Move.from_uci(_quick_search(fen))
+
+    logger.info(
+        f"Searched {fen} to depth {stats['depth']}: {uci} ({stats['nodes']} nodes, {stats['nps']:.0f} nodes/s)"
+    )
+    return chess.Move.from_uci(uci)
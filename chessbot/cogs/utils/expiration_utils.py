@@ -0,0 +1,142 @@
+import asyncio
+import datetime
+import heapq
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ... import database
+
+
+class ExpirationScheduler:
+    def __init__(self) -> None:
+        self._heap: List[Tuple[datetime.datetime, int]] = []
+        # game id -> current expiration date, stale heap entries are skipped
+        self._due: Dict[int, datetime.datetime] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # games are scheduled from the database threads
+        self._lock = threading.Lock()
+        self.enabled = True
+
+    def load(self) -> None:
+        rows = (
+            database.session.query(database.Game.id, database.Game.expiration_date)
+            .filter(database.Game.winner.is_(None))
+            .filter(database.Game.expiration_date.isnot(None))
+            .all()
+        )
+
+        with self._lock:
+            self._due = {game_id: date for game_id, date in rows}
+            self._heap = [(date, game_id) for game_id, date in rows]
+            heapq.heapify(self._heap)
+
+        logger.info(f"Scheduled {len(self._heap)} ongoing games for expiration")
+
+    def schedule(
+        self, game_id: int, expiration_date: Optional[datetime.datetime]
+    ) -> None:
+        if not self.enabled:
+            return
+        if expiration_date is None:
+            self.cancel(game_id)
+            return
+        with self._lock:
+            if self._due.get(game_id) == expiration_date:
+                return  # already scheduled
+
+            self._due[game_id] = expiration_date
+            heapq.heappush(self._heap, (expiration_date, game_id))
+            self._compact()
+            is_next = self._heap[0] == (expiration_date, game_id)
+
+        if is_next and self._loop is not None:
+            # the new entry is due before the one the loop is waiting for
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def cancel(self, game_id: int) -> None:
+        with self._lock:
+            self._due.pop(game_id, None)
+            self._compact()
+
+    def _compact(self) -> None:
+        # every move pushes a new entry, the replaced ones would otherwise stay in
+        # the heap until their date passes. Called with the lock held.
+        if len(self._heap) > 2 * len(self._due):
+            self._heap = [(date, game_id) for game_id, date in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def stage(self, game_id: int, expiration_date: Optional[datetime.datetime]) -> None:
+        # applied once the session commits, see _on_commit. None cancels the game.
+        changes = database.session.info.setdefault("expiration_changes", {})
+        changes[game_id] = expiration_date
+
+    def pop_due(self, now: datetime.datetime) -> List[int]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expiration_date, game_id = heapq.heappop(self._heap)
+                if self._due.get(game_id) == expiration_date:
+                    del self._due[game_id]
+                    due.append(game_id)
+
+        return due
+
+    def seconds_until_next(self, now: datetime.datetime) -> Optional[float]:
+        with self._lock:
+            if not self._heap:
+                return None
+            return max((self._heap[0][0] - now).total_seconds(), 0)
+
+    async def run(self, resolve: Callable[[], Any], poll_interval: float = 0) -> None:
+        # resolve() expires every game that is due according to the database, so with
+        # poll_interval it also catches the games scheduled by other processes
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_event_loop()
+        last_poll = time.monotonic()
+
+        while True:
+            self._wakeup.clear()
+
+            due = self.pop_due(datetime.datetime.now())
+            polling = (
+                poll_interval > 0 and time.monotonic() - last_poll >= poll_interval
+            )
+            if due or polling:
+                logger.info(f"{len(due)} games are due to expire")
+                last_poll = time.monotonic()
+                try:
+                    with database.session_scope():
+                        await database.run_sync(resolve)
+                except Exception as err:
+                    logger.error(err)
+
+            timeout = self.seconds_until_next(datetime.datetime.now())
+            if poll_interval > 0:
+                timeout = (
+                    poll_interval if timeout is None else min(timeout, poll_interval)
+                )
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass  # the earliest game is due, or it's time to poll
+
+    def _on_commit(self, session: Session) -> None:
+        changes = session.info.pop("expiration_changes", {})
+        for game_id, expiration_date in changes.items():
+            self.schedule(game_id, expiration_date)
+
+    def _on_rollback(self, session: Session) -> None:
+        # the games keep the expiration dates they have in the database
+        session.info.pop("expiration_changes", None)
+
+
+expiration_scheduler = ExpirationScheduler()
+
+event.listen(database.Session, "after_commit", expiration_scheduler._on_commit)
+event.listen(database.Session, "after_rollback", expiration_scheduler._on_rollback)
@@ -0,0 +1,143 @@
+import datetime
+import zlib
+from typing import BinaryIO, Dict, Iterator, Optional
+
+import chess
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased
+
+from .chess_utils import save_to_pgn
+from ... import database
+from ...constants import WHITE, BLACK, DRAW
+from ...database.move_encoding import decode_moves
+
+EXPORT_BATCH_SIZE = 500  # rows fetched from the cursor at a time
+EXPORT_CHUNK_SIZE = 64 * 1024  # bytes of PGN compressed and written at a time
+EXPORT_MAX_BYTES = 8 * 1024 * 1024  # Discord's attachment limit
+
+PGN_RESULTS = {WHITE: "1-0", BLACK: "0-1", DRAW: "1/2-1/2", None: "*"}
+
+
+def _format_date(date: Optional[datetime.datetime]) -> str:
+    return "????.??.??" if date is None else date.strftime("%Y.%m.%d")
+
+
+def _get_game_rows(user: Optional[database.User]) -> Iterator[tuple]:
+    Game = database.Game
+    White, Black = aliased(database.User), aliased(database.User)
+    query = (
+        database.session.query(
+            Game.id,
+            Game.moves,
+            Game.winner,
+            Game.win_reason,
+            Game.created_date,
+            Game.finished_date,
+            White.username,
+            White.discord_id,
+            Black.username,
+            Black.discord_id,
+        )
+        .outerjoin(White, Game.white_id == White.id)
+        .outerjoin(Black, Game.black_id == Black.id)
+        .order_by(Game.id)
+    )
+    if user is not None:
+        query = query.filter(or_(Game.white_id == user.id, Game.black_id == user.id))
+
+    # plain rows from a server-side cursor, so only a batch is in memory at a time
+    result = database.session.execute(
+        query.statement.execution_options(stream_results=True)
+    )
+    try:
+        while True:
+            rows = result.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+
+            yield from rows
+    finally:
+        result.close()
+
+
+def get_game_pgns(user: Optional[database.User] = None) -> Iterator[str]:
+    # every game of the user (or every game if there is no user), oldest first
+    for row in _get_game_rows(user):
+        (game_id, moves, winner, win_reason, created_date, finished_date) = row[:6]
+        white_name, white_id, black_name, black_id = row[6:]
+
+        headers: Dict[str, str] = {
+            "Event": f"ChessBot game #{game_id}",
+            "Site": "Discord",
+            "Date": _format_date(created_date),
+            "Round": "-",
+            "White": str(white_name or white_id or "?"),
+            "Black": str(black_name or black_id or "?"),
+            "Result": PGN_RESULTS[winner],
+            "GameId": str(game_id),
+        }
+        if finished_date is not None:
+            headers["EndDate"] = _format_date(finished_date)
+        if win_reason is not None:
+            headers["Termination"] = win_reason
+
+        board = chess.Board()
+        for move in decode_moves(moves):
+            board.push(move)
+
+        yield save_to_pgn(board, headers) + "\n\n"
+
+
+def get_pgn_chunks(
+    pgns: Iterator[str], compress: bool = False, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    # wbits=31 writes a gzip header, so the output is a valid .gz file
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def encode(data: bytes) -> bytes:
+        return data if compressor is None else compressor.compress(data)
+
+    buffer = []
+    buffered = 0
+    for pgn in pgns:
+        data = pgn.encode("utf-8")
+        buffer.append(data)
+        buffered += len(data)
+
+        if buffered >= chunk_size:
+            chunk = encode(b"".join(buffer))
+            buffer, buffered = [], 0
+            if chunk:
+                yield chunk
+
+    chunk = encode(b"".join(buffer))
+    if compressor is not None:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_games(
+    file: BinaryIO,
+    user: Optional[database.User] = None,
+    compress: bool = False,
+    max_bytes: int = None,
+) -> int:
+    # returns the number of exported games
+    count = 0
+
+    def counted(pgns: Iterator[str]) -> Iterator[str]:
+        nonlocal count
+        for pgn in pgns:
+            count += 1
+            yield pgn
+
+    written = 0
+    for chunk in get_pgn_chunks(counted(get_game_pgns(user)), compress):
+        written += len(chunk)
+        if max_bytes is not None and written > max_bytes:
+            raise RuntimeError(f"The export is larger than {max_bytes} bytes")
+
+        file.write(chunk)
+
+    return count
@@ -1,34 +1,189 @@
-from .chess_utils import (
-    load_from_pgn,
-    get_winner,
-    get_game_over_reason,
-    get_turn,
-    undo,
-    save_to_pgn,
-)
+import chess
+
+from .chess_utils import load_board, save_board, get_winner, get_game_over_reason, undo
 from .user_utils import get_database_user
 from .elo_utils import recalculate_elo
+from .expiration_utils import expiration_scheduler
+from .position_utils import index_position, unindex_positions
 from ... import constants, database
 from ...config import EXPIRATION_TIMEDELTA
+from ...database.move_encoding import get_ply
+from ...metrics import metrics
 
+from sqlalchemy import or_
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
 from loguru import logger
 import datetime
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+GAMES_PAGE_SIZE = 10
+EXPIRATION_RETRY_TIMEDELTA = datetime.timedelta(seconds=30)
+GAME_STATUSES = ["ongoing", "finished", "all"]
+
+
+class GameContext:
+    # the game a command works on, its board is built at most once per command
+    # and its outcome is only evaluated again after the board changes
+    def __init__(self, game: database.Game) -> None:
+        self.game = game
+        self._board: Optional[chess.Board] = None
+        # (claim_draw, both_agreed) -> (winner, reason), or None if the game goes on
+        self._outcomes: Dict[Tuple[bool, bool], Optional[Tuple[int, str]]] = {}
+
+    @property
+    def board(self) -> chess.Board:
+        if self._board is None:
+            with metrics.timer("load"):
+                self._board = load_board(self.game)
+
+        return self._board
+
+    def save_board(self, board: chess.Board = None) -> None:
+        if board is not None:
+            self._board = board
+
+        save_board(self.game, self.board)
+        database.add_to_database(self.game)
+        self._outcomes.clear()
+
+    def get_outcome(
+        self, claim_draw: bool = False, both_agreed: bool = False
+    ) -> Optional[Tuple[int, str]]:
+        key = (claim_draw, both_agreed)
+        if key not in self._outcomes:
+            with metrics.timer("outcome"):
+                self._outcomes[key] = self._evaluate_outcome(claim_draw, both_agreed)
+
+        return self._outcomes[key]
+
+    def _evaluate_outcome(
+        self, claim_draw: bool, both_agreed: bool
+    ) -> Optional[Tuple[int, str]]:
+        try:
+            return (
+                get_winner(self.board, claim_draw=claim_draw, both_agreed=both_agreed),
+                get_game_over_reason(
+                    self.board, claim_draw=claim_draw, both_agreed=both_agreed
+                ),
+            )
+        except RuntimeError as err:
+            # not actually an error, just the reasoning behind the game not being over
+            logger.info(f"The game has not ended yet: {err}")
+            return None
+
+
+def get_last_game_id(user_id: int) -> int:
+    # doesn't load the user, the game isn't locked yet (see get_game_ctx)
+    last_game_id = (
+        database.session.query(database.User.last_game_id)
+        .filter_by(discord_id=user_id)
+        .scalar()
+    )
+    if last_game_id is None:
+        raise RuntimeError(f"User #{user_id} does not have a last game")
+
+    return last_game_id
 
 
 def get_game(user_id: int, game_id: int) -> database.Game:
     if game_id is None:
-        user = get_database_user(user_id)
-        game = user.last_game
-        if game is None:
-            raise RuntimeError(f"User #{user_id} does not have a last game")
-    else:
-        game = database.session.query(database.Game).get(game_id)
-        if game is None:
-            raise RuntimeError(f"Game #{game_id} does not exist in the database")
+        game_id = get_last_game_id(user_id)
+
+    game = (
+        database.session.query(database.Game)
+        .options(joinedload(database.Game.white), joinedload(database.Game.black))
+        .get(game_id)
+    )
+    if game is None:
+        raise RuntimeError(f"Game #{game_id} does not exist in the database")
+
+    return game
+
+
+def create_game(
+    white: database.User, black: database.User, bot_level: int = None
+) -> database.Game:
+    game = database.Game(white=white, black=black, bot_level=bot_level)
+    white.last_game = game
+    black.last_game = game
+    database.add_to_database(game)
 
+    database.session.flush()  # assigns the id and the expiration date
+    expiration_scheduler.stage(game.id, game.expiration_date)
+    index_position(game, chess.Board())  # the starting position, ply 0
     return game
 
 
+def parse_games_args(args: Iterable[str]) -> Dict[str, Any]:
+    # /games [all|finished] [before:<game id>] [@opponent] [from:YYYY-MM-DD] [to:YYYY-MM-DD]
+    kwargs: Dict[str, Any] = {}
+    for arg in args:
+        mention = re.fullmatch(r"<@!?(\d+)>", arg)
+        name, _, value = arg.partition(":")
+
+        if arg.lower() in GAME_STATUSES:
+            kwargs["status"] = arg.lower()
+        elif mention is not None:
+            kwargs["opponent_id"] = int(mention.group(1))
+        elif name.lower() == "before":
+            kwargs["before_id"] = int(value)  # the cursor, not a page number
+        elif name.lower() in ["from", "to"]:
+            date = datetime.datetime.strptime(value, "%Y-%m-%d")
+            if name.lower() == "from":
+                kwargs["since"] = date
+            else:
+                kwargs["until"] = date + datetime.timedelta(days=1)
+        else:
+            raise ValueError(f'Unknown /games argument "{arg}"')
+
+    return kwargs
+
+
+def get_user_games(
+    user: database.User,
+    status: str = "ongoing",
+    opponent_id: int = None,
+    since: datetime.datetime = None,
+    until: datetime.datetime = None,
+    before_id: int = None,
+    page_size: int = GAMES_PAGE_SIZE,
+) -> Tuple[List[database.Game], Optional[int]]:
+    Game = database.Game
+    query = (
+        database.session.query(Game)
+        .options(joinedload(Game.white), joinedload(Game.black))
+        .filter(or_(Game.white_id == user.id, Game.black_id == user.id))
+    )
+
+    if status == "ongoing":
+        query = query.filter(Game.winner.is_(None))
+    elif status == "finished":
+        query = query.filter(Game.winner.isnot(None))
+
+    if opponent_id is not None:
+        opponent = get_database_user(opponent_id)
+        query = query.filter(
+            or_(Game.white_id == opponent.id, Game.black_id == opponent.id)
+        )
+    if since is not None:
+        query = query.filter(Game.created_date >= since)
+    if until is not None:
+        query = query.filter(Game.created_date < until)
+
+    # keyset pagination, newest games first
+    if before_id is not None:
+        query = query.filter(Game.id < before_id)
+    games = query.order_by(Game.id.desc()).limit(page_size + 1).all()
+
+    # the extra game only tells whether there are older games, which are the ones
+    # before the last game of this page
+    next_before_id = games[page_size - 1].id if len(games) > page_size else None
+    return games[:page_size], next_before_id
+
+
 def has_game_expired(game: database.Game) -> bool:
     if game.expiration_date is not None:
         return datetime.datetime.now() > game.expiration_date
@@ -36,26 +191,21 @@ def has_game_expired(game: database.Game) -> bool:
 
 
 def update_game(
-    game: database.Game,
+    game_ctx: GameContext,
     recalculate_expiration_date: bool = False,
     reset_action: bool = False,
     concede_side: int = None,
     only_check_expiration: bool = False,
 ) -> None:
+    game = game_ctx.game
     if game.winner is not None:
         return  # if the game has already finished, there is nothing to do
 
-    board = load_from_pgn(game.pgn)
-    turn = get_turn(board)
-
     if has_game_expired(game):
-        game.win_reason = "Game expired"
-        if turn == constants.WHITE:
-            game.winner = constants.BLACK
-        else:
-            game.winner = constants.WHITE
+        expire_game(game)
 
         database.add_to_database(game)
+        expiration_scheduler.stage(game.id, None)
 
         recalculate_elo(game)
         return
@@ -71,9 +221,11 @@ def update_game(
 
         concede_side_str = constants.turn_to_str(concede_side).capitalize()
         game.win_reason = f"{concede_side_str} conceded"
+        game.finished_date = datetime.datetime.now()
         game.expiration_date = None
 
         database.add_to_database(game)
+        expiration_scheduler.stage(game.id, None)
 
         recalculate_elo(game)
         return
@@ -81,26 +233,19 @@ def update_game(
     if recalculate_expiration_date:
         game.expiration_date = datetime.datetime.now() + EXPIRATION_TIMEDELTA
         database.add_to_database(game)
+        expiration_scheduler.stage(game.id, game.expiration_date)
 
     claim_draw = game.action_proposed == constants.ACTION_DRAW
     undo_last = game.action_proposed == constants.ACTION_UNDO
     both_agreed = game.white_accepted_action and game.black_accepted_action
 
-    try:
-        winner = get_winner(board, claim_draw=claim_draw, both_agreed=both_agreed)
-        reason = get_game_over_reason(
-            board, claim_draw=claim_draw, both_agreed=both_agreed
-        )
-    except RuntimeError as err:
-        logger.info("The game has not ended yet:")
-        logger.info(
-            err
-        )  # not actually an error, just the reasoning behind the game not being over
-
+    outcome = game_ctx.get_outcome(claim_draw=claim_draw, both_agreed=both_agreed)
+    if outcome is None:
         if undo_last and both_agreed:
+            board = load_board(game, full_history=True)
             undo(board)
-            game.pgn = save_to_pgn(board)
-            database.add_to_database(game)
+            game_ctx.save_board(board)
+            unindex_positions(game, get_ply(board))
 
         if reset_action:
             game.action_proposed = constants.ACTION_NONE
@@ -111,24 +256,77 @@ def update_game(
 
         return
 
-    game.winner = winner
-    game.win_reason = reason
+    game.winner, game.win_reason = outcome
+    game.finished_date = datetime.datetime.now()
     game.expiration_date = None
     database.add_to_database(game)
+    expiration_scheduler.stage(game.id, None)
 
     recalculate_elo(game)
 
 
-def update_ongoing_games() -> None:
+def expire_game(game: database.Game) -> None:
+    game.win_reason = "Game expired"
+    game.finished_date = game.expiration_date
+    if game.turn == constants.WHITE:
+        game.winner = constants.BLACK
+    else:
+        game.winner = constants.WHITE
+
+
+def expire_games(now: datetime.datetime = None) -> int:
+    if now is None:
+        now = datetime.datetime.now()
+
     games = (
         database.session.query(database.Game)
+        .options(joinedload(database.Game.white), joinedload(database.Game.black))
         .filter(database.Game.winner.is_(None))
+        .filter(database.Game.expiration_date < now)
+        .order_by(database.Game.expiration_date)
         .all()
-    )
+    )  # served by the (winner, expiration_date) index
+
+    if _expire_and_commit(games):
+        for game in games:
+            expiration_scheduler.cancel(game.id)
+
+        logger.info(f"Expired {len(games)} games")
+        return len(games)
+
+    # e.g. a move in one of the games bumped its version meanwhile, so each game
+    # is committed on its own and only the failing ones are tried again later
+    expired = 0
     for game in games:
-        update_game(game, only_check_expiration=True)
-        # checking only the expiration, since after each meaningful action (!offer, !move, etc.)
-        # the game is updated automatically
+        game_id = game.id
+        if game.winner is not None or not game.expiration_date < now:
+            continue  # finished or moved since it was read, already (re)scheduled
+
+        if _expire_and_commit([game]):
+            expiration_scheduler.cancel(game_id)
+            expired += 1
+        else:
+            expiration_scheduler.schedule(game_id, now + EXPIRATION_RETRY_TIMEDELTA)
+
+    logger.info(f"Expired {expired} of {len(games)} games")
+    return expired
+
+
+def _expire_and_commit(games: List[database.Game]) -> bool:
+    try:
+        for game in games:
+            # the elo updates are applied in expiration order, so a player with several
+            # expired games gets the same ratings as if they expired one by one
+            expire_game(game)
+            recalculate_elo(game)
+
+        return database.commit_session()
+    except (RuntimeError, DatabaseError, StaleDataError) as err:
+        # e.g. a rating changed by another bot process meanwhile, or a stale game
+        # flushed by the rating update's autoflush
+        logger.error(err)
+        database.session.rollback()
+        return False
 
 
 def who_offered_action(game: database.Game) -> int:
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from ...config import IMAGE_CACHE_BYTES, IMAGE_CACHE_DIR
+
+ImageKey = Tuple[str, Optional[str], Optional[int], int, str, str]
+
+
+class ImageCache:
+    def __init__(self, max_bytes: int, directory: str = None) -> None:
+        self.max_bytes = max_bytes
+        self.directory = directory
+
+        self._images: "OrderedDict[ImageKey, bytes]" = OrderedDict()
+        self._bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(
+        fen: str,
+        lastmove: Optional[str],
+        check: Optional[int],
+        size: int,
+        theme: str,
+        backend: str,
+    ) -> ImageKey:
+        # the image only depends on the piece placement, not on the move counters
+        return fen.split(" ")[0], lastmove, check, size, theme, backend
+
+    def _path(self, key: ImageKey) -> str:
+        digest = hashlib.sha1(repr(key).encode("UTF-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.png")
+
+    def _read(self, key: ImageKey) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: ImageKey, png: bytes) -> None:
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(png)
+        os.replace(temp_path, path)  # readers never see a partially written image
+
+    def _remember(self, key: ImageKey, png: bytes) -> None:
+        if len(png) > self.max_bytes:
+            return
+
+        if key in self._images:
+            self._bytes -= len(self._images.pop(key))
+        self._images[key] = png
+        self._bytes += len(png)
+
+        while self._bytes > self.max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    async def get(self, key: ImageKey) -> Optional[bytes]:
+        png = self._images.get(key)
+        if png is not None:
+            self._images.move_to_end(key)
+            self.memory_hits += 1
+            return png
+
+        if self.directory is not None:
+            loop = asyncio.get_event_loop()
+            png = await loop.run_in_executor(None, self._read, key)
+            if png is not None:
+                self._remember(key, png)
+                self.disk_hits += 1
+                return png
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: ImageKey, png: bytes) -> None:
+        self._remember(key, png)
+
+        if self.directory is not None:
+            loop = asyncio.get_event_loop()
+            try:
+                await loop.run_in_executor(None, self._write, key, png)
+            except OSError as err:
+                logger.error(f"Failed to write a rendered image to the disk: {err}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "images": len(self._images),
+            "bytes": self._bytes,
+        }
+
+
+image_cache = ImageCache(IMAGE_CACHE_BYTES, IMAGE_CACHE_DIR)
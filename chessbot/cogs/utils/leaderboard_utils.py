@@ -0,0 +1,134 @@
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ... import database
+from ...config import LEADERBOARD_MAX_AGE
+
+LEADERBOARD_SIZE = 50  # the largest "Top N" of /leaderboard
+
+# (-elo, user id, shown name), so that sorting puts the best players first
+Entry = Tuple[float, int, str]
+
+
+def _get_top_users(top: int) -> List[database.User]:
+    return (
+        database.session.query(database.User)
+        .filter(database.User.is_bot.is_(False))
+        .order_by(database.User.elo.desc(), database.User.id)
+        .limit(top)
+        .all()
+    )
+
+
+def _to_entry(user: database.User) -> Entry:
+    elo = user.elo
+    if elo == int(elo):
+        elo = int(elo)  # the same as it reads back from the integer column
+
+    return (-elo, user.id, str(user.username or user.discord_id))
+
+
+class Leaderboard:
+    def __init__(self) -> None:
+        self._entries: List[Entry] = []
+        self._user_ids: Dict[int, Entry] = {}
+        # False when there are more players than the entries that are kept
+        self._complete = True
+        # set when a player fell out of the top and the next one has to be queried
+        self._stale = True
+        self._messages: Dict[int, Optional[str]] = {}
+        self._loaded_at = 0.0
+        # ratings change in the database threads
+        self._lock = threading.Lock()
+
+    @property
+    def stale(self) -> bool:
+        age = time.monotonic() - self._loaded_at
+        if LEADERBOARD_MAX_AGE > 0 and age > LEADERBOARD_MAX_AGE:
+            return True  # other bot processes change the ratings too
+
+        return self._stale
+
+    def load(self) -> None:
+        users = _get_top_users(LEADERBOARD_SIZE + 1)
+
+        with self._lock:
+            self._entries = [_to_entry(user) for user in users[:LEADERBOARD_SIZE]]
+            self._user_ids = {entry[1]: entry for entry in self._entries}
+            self._complete = len(users) <= LEADERBOARD_SIZE
+            self._stale = False
+            self._loaded_at = time.monotonic()
+            self._messages.clear()
+
+        logger.info(f"Loaded the leaderboard with {len(self._entries)} players")
+
+    def stage(self, *users: database.User) -> None:
+        # applied once the session commits, see _on_commit
+        players = [user for user in users if not user.is_bot]
+        database.session.info.setdefault("leaderboard_users", set()).update(players)
+
+    def update(self, user: database.User) -> None:
+        entry = _to_entry(user)
+        with self._lock:
+            if self._stale:
+                return  # the whole list is queried again before it is shown
+
+            self._messages.clear()
+
+            old_entry = self._user_ids.pop(user.id, None)
+            if old_entry is not None:
+                was_last = self._entries[-1]
+                self._entries.remove(old_entry)
+
+                if not self._complete and entry > was_last:
+                    # someone outside of the kept entries could be ahead now
+                    self._stale = True
+                    return
+            elif not self._complete and (
+                not self._entries or entry > self._entries[-1]
+            ):
+                return  # not in the top
+
+            bisect.insort(self._entries, entry)
+            self._user_ids[user.id] = entry
+
+            if len(self._entries) > LEADERBOARD_SIZE:
+                dropped = self._entries.pop()
+                del self._user_ids[dropped[1]]
+                self._complete = False
+
+    def get_message(self, top: int) -> Optional[str]:
+        with self._lock:
+            if top not in self._messages:
+                self._messages[top] = self._render(top)
+
+            return self._messages[top]
+
+    def _render(self, top: int) -> Optional[str]:
+        entries = self._entries[:top]
+        if not entries:
+            return None
+
+        return "__Global leaderboard:__\n\n" + "\n".join(
+            f"**[{i + 1}]** {name} - {-elo} elo."
+            for i, (elo, _, name) in enumerate(entries)
+        )
+
+    def _on_commit(self, session: Session) -> None:
+        for user in session.info.pop("leaderboard_users", ()):
+            self.update(user)
+
+    def _on_rollback(self, session: Session) -> None:
+        session.info.pop("leaderboard_users", None)
+
+
+leaderboard = Leaderboard()
+
+event.listen(database.Session, "after_commit", leaderboard._on_commit)
+event.listen(database.Session, "after_rollback", leaderboard._on_rollback)
@@ -0,0 +1,17 @@
+import asyncio
+import weakref
+
+# game id -> the lock of the commands working on that game. A lock only lives
+# while a command holds or waits for it, so idle games don't keep one around.
+_game_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def get_game_lock(game_id: int) -> asyncio.Lock:
+    lock = _game_locks.get(game_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _game_locks[game_id] = lock
+
+    return lock
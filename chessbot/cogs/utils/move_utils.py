@@ -1,25 +1,27 @@
-from .chess_utils import load_from_pgn, save_to_pgn, move, get_turn
+from .chess_utils import move
+from .game_utils import GameContext
+from .position_utils import index_position
 from ... import database, constants
+from ...metrics import metrics
 
 
-def handle_turn_check(user: database.User, game: database.Game) -> None:
-    board = load_from_pgn(game.pgn)
-
-    if (get_turn(board) == constants.WHITE and user == game.black) or (
-        get_turn(board) == constants.BLACK and user == game.white
+def handle_turn_check(user: database.User, game_ctx: GameContext) -> None:
+    game = game_ctx.game
+    if (game.turn == constants.WHITE and user == game.black) or (
+        game.turn == constants.BLACK and user == game.white
     ):
         raise RuntimeError(
             f"User #{user.discord_id} tried to move on the wrong turn in game #{game.id}"
         )
 
 
-def handle_move(game: database.Game, san_move: str) -> None:
-    board = load_from_pgn(game.pgn)
-
+def handle_move(game_ctx: GameContext, san_move: str) -> None:
+    board = game_ctx.board
     try:
-        move(board, san_move)
+        with metrics.timer("move"):
+            move(board, san_move)
     except ValueError as err:
         raise err
 
-    game.pgn = save_to_pgn(board)
-    database.add_to_database(game)
+    game_ctx.save_board()
+    index_position(game_ctx.game, board)
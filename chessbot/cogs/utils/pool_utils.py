@@ -0,0 +1,52 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional
+
+from ...metrics import metrics
+
+# The functions given to a process pool (the renderers, the engine search and the
+# PGN parser) only take and return plain values, which are pickled to and from
+# the worker processes.
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class PoolQueue:
+    # the calls submitted to a pool that haven't finished yet, timed as the phase
+    # called name (see metrics.py)
+    def __init__(self, name: str, size: int) -> None:
+        self.name = name
+        self.size = size
+        self.pending = 0
+
+    def _on_done(self, future: asyncio.Future) -> None:
+        self.pending -= 1
+        if not future.cancelled():
+            # marks the error as retrieved, nobody awaits a call that timed out
+            future.exception()
+
+
+async def submit_bounded(
+    executor: Optional[Executor],
+    queue: PoolQueue,
+    fn: Callable[..., Any],
+    *args: Any,
+    timeout: float,
+) -> Any:
+    # raises PoolSaturated when the queue is full, and asyncio.TimeoutError when
+    # the call takes longer than timeout. Without an executor the call runs in a
+    # thread, so that the event loop (and the heartbeat) keeps running.
+    if queue.pending >= queue.size:
+        raise PoolSaturated()
+
+    loop = asyncio.get_event_loop()
+    future = loop.run_in_executor(executor, fn, *args)
+    # a call that timed out keeps its process busy, so it is only
+    # counted as finished once the process is done with it
+    queue.pending += 1
+    future.add_done_callback(queue._on_done)
+
+    with metrics.timer(queue.name):
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
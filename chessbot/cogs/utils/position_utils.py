@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Tuple
+
+import chess
+import chess.polyglot
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from ... import database
+from ...database.move_encoding import decode_moves, get_ply
+
+POSITION_GAMES_LIMIT = 10
+
+
+def get_position_hash(board: chess.Board) -> int:
+    # Polyglot hashes are unsigned, the database stores signed 64-bit integers
+    zobrist_hash = chess.polyglot.zobrist_hash(board)
+    return zobrist_hash - 2 ** 64 if zobrist_hash >= 2 ** 63 else zobrist_hash
+
+
+def get_ply_name(ply: int) -> str:
+    # ply 1 is white's first move, ply 2 black's first move
+    if ply == 0:
+        return "Starting position"
+
+    side = "white" if ply % 2 == 1 else "black"
+    return f"After {side}'s move {(ply + 1) // 2}"
+
+
+def index_position(game: database.Game, board: chess.Board) -> None:
+    # called after every move, the board may only hold the last moves of the game
+    database.add_to_database(
+        database.Position(
+            zobrist_hash=get_position_hash(board), game_id=game.id, ply=get_ply(board)
+        )
+    )
+
+
+def unindex_positions(game: database.Game, ply: int) -> None:
+    # the positions after ply were undone
+    database.session.query(database.Position).filter(
+        database.Position.game_id == game.id, database.Position.ply > ply
+    ).delete(synchronize_session=False)
+
+
+def get_game_positions(game_id: int, moves: bytes) -> List[Dict[str, Any]]:
+    # the rows of every position of a game from the starting position, for bulk inserts
+    board = chess.Board()
+    positions = [
+        {"zobrist_hash": get_position_hash(board), "game_id": game_id, "ply": 0}
+    ]
+    for ply, move in enumerate(decode_moves(moves), 1):
+        board.push(move)
+        positions.append(
+            {"zobrist_hash": get_position_hash(board), "game_id": game_id, "ply": ply}
+        )
+
+    return positions
+
+
+def find_games_by_position(
+    board: chess.Board, limit: int = POSITION_GAMES_LIMIT
+) -> List[Tuple[database.Game, int]]:
+    # the latest games that reached the position, with the first ply they did at
+    Game, Position = database.Game, database.Position
+    matches = (
+        database.session.query(
+            Position.game_id.label("game_id"), func.min(Position.ply).label("ply")
+        )
+        .filter(Position.zobrist_hash == get_position_hash(board))
+        .group_by(Position.game_id)
+        .order_by(Position.game_id.desc())
+        .limit(limit)
+        .subquery()
+    )
+
+    return (
+        database.session.query(Game, matches.c.ply)
+        .join(matches, matches.c.game_id == Game.id)
+        .options(joinedload(Game.white), joinedload(Game.black))
+        .order_by(Game.id.desc())
+        .all()
+    )
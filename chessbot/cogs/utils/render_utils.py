@@ -0,0 +1,115 @@
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional
+
+import chess
+import discord
+from loguru import logger
+
+from .chess_utils import get_render_args, render_png
+from .chart_utils import render_rating_chart
+from .sprite_utils import prepare_sprites, render_png_sprites
+from .image_cache_utils import image_cache
+from .pool_utils import PoolQueue, PoolSaturated, submit_bounded
+from ...config import (
+    RENDER_PROCESSES,
+    RENDER_QUEUE_SIZE,
+    RENDER_TIMEOUT,
+    RENDER_BACKEND,
+    BOARD_THEME,
+)
+from ...metrics import metrics
+
+RENDER_BACKENDS = {"cairosvg": render_png, "sprites": render_png_sprites}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_queue = PoolQueue("render", RENDER_QUEUE_SIZE)
+
+
+def _get_renderer() -> Callable[..., bytes]:
+    renderer = RENDER_BACKENDS.get(RENDER_BACKEND)
+    if renderer is None:
+        raise RuntimeError(f'Unknown render backend "{RENDER_BACKEND}"')
+
+    return renderer
+
+
+def _prepare_renderer() -> None:
+    if RENDER_BACKEND == "sprites":
+        prepare_sprites(400, BOARD_THEME)
+
+
+def start_render_pool() -> None:
+    global _executor
+
+    _get_renderer()  # fail on startup if the backend is misconfigured
+
+    if RENDER_PROCESSES > 0 and _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=RENDER_PROCESSES, initializer=_prepare_renderer
+        )
+        logger.info(
+            f"Started a render pool with {RENDER_PROCESSES} processes ({RENDER_BACKEND})"
+        )
+    else:
+        _prepare_renderer()
+
+
+def stop_render_pool() -> None:
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+async def _render(render: Callable[..., bytes], *args: Any) -> Optional[bytes]:
+    if _executor is None:
+        with metrics.timer("render"):
+            return render(*args)
+
+    try:
+        return await submit_bounded(
+            _executor, _queue, render, *args, timeout=RENDER_TIMEOUT
+        )
+    except PoolSaturated:
+        logger.warning(
+            "The render pool is saturated, sending the message without an image"
+        )
+        return None
+    except asyncio.TimeoutError:
+        logger.error(f"Rendering {args} took longer than {RENDER_TIMEOUT}s")
+        return None
+
+
+async def render_board(board: chess.Board, size: int = 400) -> Optional[discord.File]:
+    args = get_render_args(board)
+    key = image_cache.key(
+        args["fen"], args["lastmove"], args["check"], size, BOARD_THEME, RENDER_BACKEND
+    )
+
+    png = await image_cache.get(key)
+    if png is None:
+        png = await _render(
+            _get_renderer(),
+            args["fen"],
+            args["lastmove"],
+            args["check"],
+            size,
+            BOARD_THEME,
+        )
+        if png is None:
+            return None
+
+        await image_cache.put(key, png)
+
+    return discord.File(io.BytesIO(png), filename="board.png")
+
+
+async def render_chart(ratings: List[float]) -> Optional[discord.File]:
+    png = await _render(render_rating_chart, ratings, 600, 240, BOARD_THEME)
+    if png is None:
+        return None
+
+    return discord.File(io.BytesIO(png), filename="elo.png")
@@ -0,0 +1,325 @@
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import chess
+import chess.polyglot
+
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000  # scores above it are mates in a number of plies
+MAX_PLY = 128
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+TRANSPOSITION_TABLE_SIZE = 1000000  # entries, the table is cleared when it is full
+
+# centipawns
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 0,
+}
+
+# bonuses for the squares of white's pieces, a1 first (rank 1 on the first row),
+# black's pieces use the mirrored squares
+# fmt: off
+PIECE_SQUARE_TABLES = {
+    chess.PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    chess.KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    chess.BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    chess.ROOK: [
+        0, 0, 0, 5, 5, 0, 0, 0,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    chess.QUEEN: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+    chess.KING: [
+        20, 30, 10, 0, 0, 10, 30, 20,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+    ],
+}
+# fmt: on
+
+
+def _get_square_values(color: bool, piece_type: int) -> List[int]:
+    table = PIECE_SQUARE_TABLES[piece_type]
+    if color == chess.BLACK:
+        table = [table[chess.square_mirror(square)] for square in chess.SQUARES]
+
+    return [PIECE_VALUES[piece_type] + bonus for bonus in table]
+
+
+# (color, piece type) -> the value of the piece on each square
+_SQUARE_VALUES = {
+    (color, piece_type): _get_square_values(color, piece_type)
+    for color in chess.COLORS
+    for piece_type in PIECE_SQUARE_TABLES
+}
+
+
+def evaluate(board: chess.Board) -> int:
+    # material and piece placement, from the point of view of the side to move
+    white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    score = 0
+    for piece_type, mask in [
+        (chess.PAWN, board.pawns),
+        (chess.KNIGHT, board.knights),
+        (chess.BISHOP, board.bishops),
+        (chess.ROOK, board.rooks),
+        (chess.QUEEN, board.queens),
+        (chess.KING, board.kings),
+    ]:
+        values = _SQUARE_VALUES[(chess.WHITE, piece_type)]
+        for square in chess.scan_reversed(mask & white):
+            score += values[square]
+
+        values = _SQUARE_VALUES[(chess.BLACK, piece_type)]
+        for square in chess.scan_reversed(mask & black):
+            score -= values[square]
+
+    return score if board.turn == chess.WHITE else -score
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Search:
+    # negamax alpha-beta with iterative deepening, a transposition table,
+    # quiescence search and move ordering (hash move, MVV-LVA, killer moves)
+    def __init__(self, board: chess.Board, move_time: float) -> None:
+        self.board = board.copy(stack=False)
+        self.deadline = time.perf_counter() + move_time
+        self.nodes = 0
+        self.can_stop = False  # the first iteration always finishes
+
+        # position -> (depth, score, flag, best move)
+        self.table: Dict[int, Tuple[int, int, int, Optional[chess.Move]]] = {}
+        self.killers: List[List[Optional[chess.Move]]] = [
+            [None, None] for _ in range(MAX_PLY + 1)
+        ]
+        self.path: Set[int] = set()  # positions on the way to the current one
+        self.best_move: Optional[chess.Move] = None
+
+    def _check_time(self) -> None:
+        self.nodes += 1
+        if self.nodes & 1023 != 0 or not self.can_stop:
+            return  # the clock is only checked every 1024 nodes
+
+        if time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def _get_capture_score(self, move: chess.Move) -> int:
+        # most valuable victim, least valuable attacker
+        board = self.board
+        victim = board.piece_type_at(move.to_square) or chess.PAWN  # en passant
+        attacker = board.piece_type_at(move.from_square)
+        return 10 * PIECE_VALUES.get(victim, 0) - PIECE_VALUES.get(attacker, 0)
+
+    def _order_moves(self, tt_move: Optional[chess.Move], ply: int) -> List[chess.Move]:
+        board = self.board
+        killers = self.killers[ply]
+
+        scored = []
+        for move in board.legal_moves:
+            if move == tt_move:
+                score = 1000000
+            elif board.is_capture(move):
+                score = 100000 + self._get_capture_score(move)
+            elif move.promotion is not None:
+                score = 90000 + PIECE_VALUES[move.promotion]
+            elif move == killers[0] or move == killers[1]:
+                score = 80000
+            else:
+                score = 0
+            scored.append((score, move))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def quiesce(self, alpha: int, beta: int, ply: int) -> int:
+        # only captures, so that the evaluation isn't taken in the middle of an exchange
+        self._check_time()
+
+        stand_pat = evaluate(self.board)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        board = self.board
+        captures = sorted(
+            board.generate_legal_captures(), key=self._get_capture_score, reverse=True
+        )
+        for move in captures:
+            board.push(move)
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            board.pop()
+
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+
+        return alpha
+
+    def negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self._check_time()
+
+        board = self.board
+        # the same hash as the positions of /position, see position_utils.py
+        key = chess.polyglot.zobrist_hash(board)
+        if ply > 0 and (key in self.path or board.halfmove_clock >= 100):
+            return (
+                0
+            )  # a repetition or the fifty-move rule, both can be claimed as a draw
+
+        tt_move = None
+        entry = self.table.get(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            # mate scores are stored relative to the position
+            if tt_score > MATE_BOUND:
+                tt_score -= ply
+            elif tt_score < -MATE_BOUND:
+                tt_score += ply
+
+            if ply > 0 and tt_depth >= depth:
+                if tt_flag == EXACT:
+                    return tt_score
+                if tt_flag == LOWER_BOUND and tt_score >= beta:
+                    return tt_score
+                if tt_flag == UPPER_BOUND and tt_score <= alpha:
+                    return tt_score
+
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiesce(alpha, beta, ply)
+
+        moves = self._order_moves(tt_move, ply)
+        if not moves:
+            return (
+                -MATE_SCORE + ply if board.is_check() else 0
+            )  # checkmate or stalemate
+
+        original_alpha = alpha
+        best_score, best_move = -MATE_SCORE - 1, moves[0]
+        self.path.add(key)
+        for move in moves:
+            board.push(move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                killers = self.killers[ply]
+                if not board.is_capture(move) and move != killers[0]:
+                    killers[0], killers[1] = move, killers[0]
+                break
+        self.path.discard(key)
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+
+        stored_score = best_score
+        if stored_score > MATE_BOUND:
+            stored_score += ply
+        elif stored_score < -MATE_BOUND:
+            stored_score -= ply
+
+        if len(self.table) >= TRANSPOSITION_TABLE_SIZE:
+            self.table.clear()
+        self.table[key] = (depth, stored_score, flag, best_move)
+
+        if ply == 0:
+            self.best_move = best_move
+        return best_score
+
+
+def search(fen: str, max_depth: int, move_time: float) -> Tuple[str, Dict[str, Any]]:
+    # returns the best move in UCI and the search statistics
+    start = time.perf_counter()
+    board = chess.Board(fen)
+    if board.is_game_over():
+        raise RuntimeError(f"There are no moves to search in {fen}")
+
+    searcher = Search(board, move_time)
+    best_move, score, depth = None, 0, 0
+    for current_depth in range(1, max_depth + 1):
+        try:
+            score = searcher.negamax(current_depth, -MATE_SCORE - 1, MATE_SCORE + 1, 0)
+        except SearchTimeout:
+            break
+
+        best_move, depth = searcher.best_move, current_depth
+        searcher.can_stop = True
+
+        if abs(score) > MATE_BOUND:
+            break  # a forced mate was found, searching deeper can't change it
+        # the next iteration takes several times longer, so it wouldn't finish anyway
+        if time.perf_counter() - start > move_time / 2:
+            break
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "depth": depth,
+        "score": score,
+        "nodes": searcher.nodes,
+        "seconds": elapsed,
+        "nps": searcher.nodes / elapsed if elapsed > 0 else 0.0,
+    }
+    if best_move is None:
+        raise RuntimeError(f"The search of {fen} didn't find a move")
+
+    return best_move.uci(), stats
@@ -1,10 +1,11 @@
 import discord
 from discord.ext import commands
-from typing import Tuple
+from typing import Optional, Tuple
 
-from .chess_utils import load_from_pgn, to_png, get_turn
+from .chess_utils import get_turn
+from .render_utils import render_board
 from .user_utils import get_discord_user
-from .game_utils import who_offered_action
+from .game_utils import GameContext, who_offered_action
 from ... import database, constants
 
 
@@ -30,7 +31,10 @@ def get_vs_line(bot: commands.Bot, game: database.Game) -> str:
     return f"{white_mention} (white) **VS.** {black_mention} (black)"
 
 
-def get_game_status(bot: commands.Bot, game: database.Game) -> Tuple[str, discord.File]:
+async def get_game_status(
+    bot: commands.Bot, game_ctx: GameContext
+) -> Tuple[str, Optional[discord.File]]:
+    game = game_ctx.game
     if not game.white or not game.black:
         raise RuntimeError(
             f"Either white or black player is not present in game #{game.id}"
@@ -39,7 +43,7 @@ def get_game_status(bot: commands.Bot, game: database.Game) -> Tuple[str, discor
     vs_line = get_vs_line(bot, game)
     status = f"__Game ID: {game.id}__\n{vs_line}\n"
 
-    board = load_from_pgn(game.pgn)
+    board = game_ctx.board
 
     if game.winner is None and game.win_reason is None:
         turn = get_turn(board)
@@ -86,4 +90,4 @@ def get_game_status(bot: commands.Bot, game: database.Game) -> Tuple[str, discor
             f"Either game.winner or game.win_reason is not present in game #{game.id}"
         )
 
-    return status, to_png(board)
+    return status, await render_board(board)
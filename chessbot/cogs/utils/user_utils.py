@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 
+from .leaderboard_utils import leaderboard
 from ... import database
 
 
@@ -30,8 +31,11 @@ def create_database_user(discord_user: discord.User) -> database.User:
         raise RuntimeError(f"User #{discord_user.id} already exists")
 
     user = database.User(
-        discord_id=discord_user.id, username=get_full_username(discord_user)
+        discord_id=discord_user.id,
+        username=get_full_username(discord_user),
+        is_bot=discord_user.bot,
     )
     database.add_to_database(user)
+    leaderboard.stage(user)
 
     return user
@@ -3,5 +3,88 @@ import datetime
 
 TOKEN = os.environ.get("TOKEN")
 DB_PATH = os.environ.get("DB_PATH")
+DB_THREADS = int(os.environ.get("DB_THREADS", 4))  # threads that run database queries
+
+# SQLite settings, applied to every connection (see benchmarks/database.py).
+# WAL lets readers run next to a writer, and with WAL synchronous=NORMAL only
+# syncs on checkpoints, which is still safe from corruption.
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", -16000))  # negative is KiB
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 64 * 1024 * 1024))
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000))  # ms
+
+# connection pool for SQLite files and other databases
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
 
 EXPIRATION_TIMEDELTA = datetime.timedelta(days=7)
+
+# sharding: SHARD_PROCESSES > 1 starts that many bot processes, each running
+# its own range of the SHARD_COUNT shards (one per process if not set)
+SHARD_COUNT = int(os.environ["SHARD_COUNT"]) if "SHARD_COUNT" in os.environ else None
+SHARD_IDS = (
+    [int(shard_id) for shard_id in os.environ["SHARD_IDS"].split(",")]
+    if "SHARD_IDS" in os.environ
+    else None
+)  # set for the bot processes by sharding.py
+SHARD_PROCESSES = int(os.environ.get("SHARD_PROCESSES", 1))
+# the launching process migrates the database once, the bot processes it starts don't
+RUN_MIGRATIONS = os.environ.get("RUN_MIGRATIONS", "1") == "1"
+
+# only one of the bot processes expires games, other processes' games are found
+# by querying the database every EXPIRATION_POLL_INTERVAL seconds (0 disables it)
+RUN_EXPIRATION = os.environ.get("RUN_EXPIRATION", "1") == "1"
+EXPIRATION_POLL_INTERVAL = float(os.environ.get("EXPIRATION_POLL_INTERVAL", 0))
+# other processes change ratings too, so the leaderboard is reloaded when it is
+# older than this many seconds (0 never reloads it)
+LEADERBOARD_MAX_AGE = float(os.environ.get("LEADERBOARD_MAX_AGE", 0))
+
+BOARD_CACHE_SIZE = int(os.environ.get("BOARD_CACHE_SIZE", 256))
+
+# board images are rendered in a pool of worker processes, 0 renders them in the bot process
+RENDER_PROCESSES = int(os.environ.get("RENDER_PROCESSES", 2))
+RENDER_QUEUE_SIZE = int(os.environ.get("RENDER_QUEUE_SIZE", 32))
+RENDER_TIMEOUT = float(os.environ.get("RENDER_TIMEOUT", 10))
+
+# "cairosvg" renders chess.svg boards, "sprites" pastes pre-rendered pieces with Pillow
+RENDER_BACKEND = os.environ.get("RENDER_BACKEND", "cairosvg")
+# one of BOARD_THEMES in chess_utils.py
+BOARD_THEME = os.environ.get("BOARD_THEME", "default")
+
+# the built-in engine plays /play @bot games in a pool of worker processes,
+# 0 searches in a thread of the bot process, which slows down the other commands
+ENGINE_PROCESSES = int(os.environ.get("ENGINE_PROCESSES", 1))
+ENGINE_QUEUE_SIZE = int(os.environ.get("ENGINE_QUEUE_SIZE", 8))
+# the strength levels as "depth:seconds", the most plies searched and the time per move
+ENGINE_LEVELS = [
+    (int(depth), float(seconds))
+    for depth, seconds in (
+        level.split(":")
+        for level in os.environ.get(
+            "ENGINE_LEVELS", "1:0.1,2:0.25,3:0.5,4:1,6:2"
+        ).split(",")
+    )
+]
+ENGINE_DEFAULT_LEVEL = int(os.environ.get("ENGINE_DEFAULT_LEVEL", 3))
+
+# /analyze evaluates positions with a local UCI engine (e.g. Stockfish), it is disabled
+# if UCI_ENGINE_PATH isn't set. The engines are started once and kept running.
+UCI_ENGINE_PATH = os.environ.get("UCI_ENGINE_PATH")
+UCI_ENGINE_PROCESSES = int(os.environ.get("UCI_ENGINE_PROCESSES", 1))
+UCI_ENGINE_HASH = int(os.environ.get("UCI_ENGINE_HASH", 64))  # MB per engine
+UCI_ENGINE_THREADS = int(os.environ.get("UCI_ENGINE_THREADS", 1))
+ANALYSIS_DEPTH = int(os.environ.get("ANALYSIS_DEPTH", 18))
+# analyses running or waiting for an engine, more are turned away
+ANALYSIS_QUEUE_SIZE = int(os.environ.get("ANALYSIS_QUEUE_SIZE", 16))
+ANALYSIS_CACHE_SIZE = int(os.environ.get("ANALYSIS_CACHE_SIZE", 4096))  # evaluations
+ANALYSIS_TIMEOUT = float(os.environ.get("ANALYSIS_TIMEOUT", 30))  # seconds
+
+# rendered images are cached in memory up to this many bytes,
+# and also on disk if IMAGE_CACHE_DIR is set
+IMAGE_CACHE_BYTES = int(os.environ.get("IMAGE_CACHE_BYTES", 32 * 1024 * 1024))
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR")
+
+# if set, the command timings are written there in the Prometheus text format
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("METRICS_INTERVAL", 15))  # seconds
@@ -1,22 +1,41 @@
-from sqlalchemy import create_engine
+import contextvars
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 
 from loguru import logger
-from ..config import DB_PATH
+from ..config import DB_PATH, RUN_MIGRATIONS
+from .engine_config import create_database_engine
 
-engine = create_engine(DB_PATH)
+engine = create_database_engine(DB_PATH)
 
 Base = declarative_base()
 
 from .user import User
 from .game import Game
+from .rating_change import RatingChange
+from .position import Position
 
-Base.metadata.create_all(engine)
+if RUN_MIGRATIONS:
+    Base.metadata.create_all(engine)
 
-Session = sessionmaker(bind=engine)
-session = Session()
+Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+# each command runs in its own scope (see session_scope.py) and gets its own session
+session_scope_id = contextvars.ContextVar("session_scope_id", default=None)
+session = scoped_session(Session, scopefunc=session_scope_id.get)
 
 from .add_to_database import add_to_database
+from .session_scope import (
+    open_session_scope,
+    close_session_scope,
+    session_scope,
+    commit_session,
+    end_transaction,
+    run_sync,
+)
+from .migrations import migrate
+
+if RUN_MIGRATIONS:
+    migrate()
 
 logger.info("SQLAlchemy session is ready")
@@ -1,6 +1,4 @@
 from typing import TypeVar
-from sqlalchemy.exc import DatabaseError
-from loguru import logger
 
 from . import session
 
@@ -8,10 +6,5 @@ T = TypeVar("T")
 
 
 def add_to_database(obj: T) -> None:
-    try:
-        session.add(obj)
-        session.commit()
-    except DatabaseError as err:
-        logger.error(err)
-
-        session.rollback()
+    # only staged, the changes of a command are committed once when it finishes
+    session.add(obj)
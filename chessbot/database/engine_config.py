@@ -0,0 +1,61 @@
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from ..config import (
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+)
+
+SQLITE_PRAGMAS = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "cache_size": SQLITE_CACHE_SIZE,
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT,
+}
+
+
+def _set_sqlite_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if value is not None:
+                cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def create_database_engine(
+    db_path: str, sqlite_pragmas: Dict[str, Any] = SQLITE_PRAGMAS
+) -> Engine:
+    url = make_url(db_path)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            db_path,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+
+    # sessions are used from the database threads, one thread at a time
+    engine_args = {"connect_args": {"check_same_thread": False}}
+    if url.database in [None, "", ":memory:"]:
+        engine_args["poolclass"] = StaticPool  # every thread sees the same database
+    else:
+        # keeps the connections open, so the pragmas are only set once per connection
+        engine_args.update(
+            poolclass=QueuePool, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW
+        )
+
+    engine = create_engine(db_path, **engine_args)
+    _set_sqlite_pragmas(engine, sqlite_pragmas)
+    return engine
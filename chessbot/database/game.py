@@ -2,20 +2,30 @@ from sqlalchemy import (
     Column,
     String,
     Integer,
+    LargeBinary,
     DateTime,
     SmallInteger,
     Boolean,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.orm import relationship
+import chess
 import datetime
 from . import Base
 from ..config import EXPIRATION_TIMEDELTA
-from ..constants import ACTION_NONE
+from ..constants import ACTION_NONE, WHITE
 
 
 class Game(Base):
     __tablename__ = "games"
+    __table_args__ = (
+        # finding the games of a player, see get_user_games
+        Index("ix_games_white_id_winner", "white_id", "winner"),
+        Index("ix_games_black_id_winner", "black_id", "winner"),
+        # finding the expired games, see expire_games
+        Index("ix_games_winner_expiration_date", "winner", "expiration_date"),
+    )
 
     id = Column(Integer, nullable=False, primary_key=True)
 
@@ -25,7 +35,16 @@ class Game(Base):
     black_id = Column(Integer, ForeignKey("users.id"))
     black = relationship("User", foreign_keys=[black_id], backref="black_games")
 
-    pgn = Column(String, default="*", nullable=False)
+    pgn = Column(String, default="*", nullable=False)  # only kept for old databases
+
+    moves = Column(LargeBinary, default=b"", nullable=False)  # see move_encoding.py
+    fen = Column(String, default=chess.STARTING_FEN, nullable=False)
+    # the board is rebuilt by replaying moves[history_ply:] from history_fen
+    history_fen = Column(String, default=chess.STARTING_FEN, nullable=False)
+    history_ply = Column(Integer, default=0, nullable=False)
+    turn = Column(
+        SmallInteger, default=WHITE, server_default=str(WHITE), nullable=False
+    )
 
     winner = Column(SmallInteger)
     win_reason = Column(String)
@@ -34,10 +53,20 @@ class Game(Base):
     white_accepted_action = Column(Boolean, default=False, nullable=False)
     black_accepted_action = Column(Boolean, default=False, nullable=False)
 
+    # the engine's strength level in a game against this bot, None for other games
+    bot_level = Column(SmallInteger)
+
+    created_date = Column(DateTime, default=datetime.datetime.now)
+    finished_date = Column(DateTime)  # the order ratings are rebuilt in, see ratings.py
     expiration_date = Column(
         DateTime, default=lambda: datetime.datetime.now() + EXPIRATION_TIMEDELTA
     )
 
+    # every update checks and increments it, so an update based on an outdated
+    # read (e.g. by another bot process) fails instead of overwriting a newer one
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self) -> str:
         winner_str = (
             "In progress"
@@ -0,0 +1,104 @@
+import io
+from typing import List, Tuple
+
+import chess
+import chess.pgn
+from sqlalchemy import inspect
+from loguru import logger
+
+from . import Base, engine, session
+from .game import Game
+from .move_encoding import encode_moves, split_history
+from ..constants import WHITE, BLACK
+
+
+def _backfill_game_moves(batch_size: int = 1000) -> None:
+    converted, last_id = 0, 0
+    while True:
+        games = (
+            session.query(Game)
+            .filter(Game.id > last_id)
+            .order_by(Game.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not games:
+            break
+
+        for game in games:
+            board = chess.pgn.read_game(io.StringIO(game.pgn)).end().board()
+
+            game.moves = encode_moves(board.move_stack)
+            game.fen = board.fen()
+            game.history_fen, game.history_ply = split_history(board)
+            game.turn = WHITE if board.turn == chess.WHITE else BLACK
+
+        session.commit()
+        converted, last_id = converted + len(games), games[-1].id
+
+    logger.info(f"Converted the PGN of {converted} games to the move encoding")
+
+
+# (table, column) -> function that fills in the column after it has been added
+BACKFILLS = {("games", "moves"): _backfill_game_moves}
+
+
+def _add_column(table_name: str, column) -> None:
+    column_type = column.type.compile(dialect=engine.dialect)
+    ddl = f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT '{column.server_default.arg}'"
+        if not column.nullable:
+            ddl += " NOT NULL"
+
+    engine.execute(ddl)
+
+
+def _has_statistics(table_name: str) -> bool:
+    if not engine.has_table("sqlite_stat1"):
+        return False
+
+    with engine.connect() as connection:
+        row = connection.execute(
+            "SELECT 1 FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table_name,)
+        ).first()
+
+    return row is not None  # an empty table has no statistics yet
+
+
+def migrate() -> None:
+    inspector = inspect(engine)
+    added: List[Tuple[str, str]] = []
+    created_indexes = False
+
+    for table in Base.metadata.tables.values():
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                logger.info(f"Adding column {table.name}.{column.name}")
+                _add_column(table.name, column)
+                added.append((table.name, column.name))
+
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                logger.info(f"Creating index {index.name}")
+                index.create(engine)
+                created_indexes = True
+
+    for key in added:
+        backfill = BACKFILLS.get(key)
+        if backfill is not None:
+            backfill()
+
+    if engine.dialect.name == "sqlite" and (
+        added or created_indexes or not _has_statistics("games")
+    ):
+        # without statistics SQLite may pick ix_games_winner_expiration_date
+        # over the player indexes when listing the games of a player. They are
+        # gathered once there are games and again after a migration, not on
+        # every start.
+        logger.info("Analyzing the database")
+        with engine.connect() as connection:
+            connection.execute("PRAGMA analysis_limit = 1000")
+            connection.execute("ANALYZE")
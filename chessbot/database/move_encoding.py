@@ -0,0 +1,39 @@
+import struct
+from typing import List, Tuple
+
+import chess
+
+# every move is stored as a little-endian 16-bit code:
+# bits 0-5 - from square, bits 6-11 - to square, bits 12-14 - promotion piece type
+
+
+def encode_moves(moves: List[chess.Move]) -> bytes:
+    codes = [
+        move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+        for move in moves
+    ]
+    return struct.pack(f"<{len(codes)}H", *codes)
+
+
+def decode_moves(data: bytes) -> List[chess.Move]:
+    codes = struct.unpack(f"<{len(data) // 2}H", data)
+    return [
+        chess.Move(code & 0x3F, code >> 6 & 0x3F, code >> 12 or None) for code in codes
+    ]
+
+
+def get_ply(board: chess.Board) -> int:
+    return 2 * (board.fullmove_number - 1) + (board.turn == chess.BLACK)
+
+
+def split_history(board: chess.Board) -> Tuple[str, int]:
+    # Finds the position right before the last irreversible move on the board.
+    # Replaying the moves from there keeps enough history for the repetition
+    # rules and for undoing the last move.
+    history = board.copy()
+    while history.move_stack:
+        move = history.pop()
+        if history.is_irreversible(move):
+            break
+
+    return history.fen(), get_ply(history)
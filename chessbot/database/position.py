@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey, Index
+from . import Base
+
+
+class Position(Base):
+    # every position reached in a game, see position_utils.py
+    __tablename__ = "positions"
+    __table_args__ = (
+        # removing the positions of undone moves, see unindex_positions
+        Index("ix_positions_game_id_ply", "game_id", "ply"),
+    )
+
+    # the Zobrist (Polyglot) hash of the position as a signed 64-bit integer,
+    # the first column of the primary key, so games are found by it directly
+    zobrist_hash = Column(BigInteger, primary_key=True, autoincrement=False)
+    game_id = Column(
+        Integer, ForeignKey("games.id"), primary_key=True, autoincrement=False
+    )
+    ply = Column(Integer, primary_key=True, autoincrement=False)  # after the move
+
+    def __repr__(self) -> str:
+        return f"<Position zobrist_hash={self.zobrist_hash}; game_id={self.game_id}; ply={self.ply}>"
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+import datetime
+from . import Base
+
+
+class RatingChange(Base):
+    __tablename__ = "rating_changes"
+    __table_args__ = (
+        # the history of a player, see get_rating_history
+        Index("ix_rating_changes_user_id_date", "user_id", "date"),
+        # a game is never rated twice, even by two bot processes
+        Index("ix_rating_changes_user_id_game_id", "user_id", "game_id", unique=True),
+    )
+
+    id = Column(Integer, nullable=False, primary_key=True)
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user = relationship("User")
+
+    game_id = Column(Integer, ForeignKey("games.id"))
+    game = relationship("Game")
+
+    elo_before = Column(Float, nullable=False)
+    elo_after = Column(Float, nullable=False)
+    date = Column(DateTime, default=datetime.datetime.now, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<RatingChange user_id={self.user_id}; game_id={self.game_id}; {self.elo_before} -> {self.elo_after}>"
@@ -0,0 +1,66 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TypeVar
+
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm.exc import StaleDataError
+from loguru import logger
+
+from . import session, session_scope_id
+from ..config import DB_THREADS
+from ..metrics import metrics
+
+T = TypeVar("T")
+
+_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="database")
+
+
+def open_session_scope() -> contextvars.Token:
+    # every scope gets its own session from the scoped_session registry
+    return session_scope_id.set(object())
+
+
+def close_session_scope(token: contextvars.Token) -> None:
+    session.remove()  # closes the scope's session and drops its identity map
+    session_scope_id.reset(token)
+
+
+def commit_session() -> bool:
+    try:
+        session.commit()
+    except (DatabaseError, StaleDataError) as err:
+        logger.error(err)
+
+        session.rollback()
+        return False
+
+    return True
+
+
+def end_transaction(commit: bool) -> None:
+    if commit:
+        commit_session()
+    else:
+        session.rollback()
+
+
+@contextmanager
+def session_scope() -> Iterator[None]:
+    token = open_session_scope()
+    try:
+        yield
+    finally:
+        close_session_scope(token)
+
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    # runs blocking database code in a worker thread, with the caller's session scope
+    context = contextvars.copy_context()
+    loop = asyncio.get_event_loop()
+    with metrics.timer("db"):
+        return await loop.run_in_executor(
+            _executor, functools.partial(context.run, func, *args, **kwargs)
+        )
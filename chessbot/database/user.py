@@ -1,8 +1,6 @@
-from typing import List
-from sqlalchemy import Column, String, Integer, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 from . import Base
-from .game import Game
 
 
 class User(Base):
@@ -11,25 +9,17 @@ class User(Base):
     id = Column(Integer, nullable=False, primary_key=True)
     discord_id = Column(Integer, nullable=False, unique=True, index=True)
     username = Column(String, index=True)
-    elo = Column(Integer, nullable=False, default=1000)
+    elo = Column(Integer, nullable=False, default=1000, index=True)
+    # bot accounts (e.g. this bot, see /play) play unrated games and aren't on the leaderboard
+    is_bot = Column(Boolean, default=False, server_default="0", nullable=False)
 
     last_game_id = Column(Integer, ForeignKey("games.id"))
-    last_game = relationship("Game", foreign_keys=[last_game_id])
+    # post_update breaks the users <-> games cycle when both are flushed together
+    last_game = relationship("Game", foreign_keys=[last_game_id], post_update=True)
 
     # white_games (relationship defined in game.py)
     # black_games (relationship defined in game.py)
-
-    @property
-    def games(self) -> List[Game]:
-        return [*self.white_games, *self.black_games]
-
-    @property
-    def ongoing_games(self) -> List[Game]:
-        return [game for game in self.games if game.winner is None]
-
-    @property
-    def finished_games(self) -> List[Game]:
-        return [game for game in self.games if game.winner is not None]
+    # use get_user_games in game_utils.py to list the games page by page
 
     def __repr__(self) -> str:
         return f"<User discord_id={self.discord_id}; elo={self.elo}>"
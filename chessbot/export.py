@@ -0,0 +1,49 @@
+"""Exports the games as PGN, oldest first.
+
+    python3 -m chessbot.export [--user DISCORD_ID] [--gzip] [-o FILE]
+
+Writes to the standard output unless a file is given.
+"""
+import argparse
+import sys
+import time
+from typing import Optional
+
+from loguru import logger
+
+from . import database
+from .cogs.utils import export_games, get_database_user
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--user", type=int, help="only export the games of this Discord user"
+    )
+    parser.add_argument("--gzip", action="store_true", help="compress the output")
+    parser.add_argument("-o", "--output", help="the output file (default: stdout)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with database.session_scope():
+        user: Optional[database.User] = None
+        if args.user is not None:
+            try:
+                user = get_database_user(args.user)
+            except RuntimeError as err:
+                raise SystemExit(err)
+
+        if args.output is None:
+            count = export_games(sys.stdout.buffer, user, args.gzip)
+            sys.stdout.buffer.flush()
+        else:
+            with open(args.output, "wb") as file:
+                count = export_games(file, user, args.gzip)
+
+    logger.info(f"Exported {count} games in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Imports finished games from PGN files into the games table.
+
+    python3 -m chessbot.import_pgn FILE [FILE ...] [--key username|discord_id]
+                                   [--processes N] [--batch-size N]
+
+The White and Black headers are matched against the users by --key, games of
+unknown players and unfinished games are skipped. Files ending in .gz are read
+compressed. Ratings aren't changed, run `python3 -m chessbot.ratings rebuild`
+afterwards to include the imported games.
+"""
+import argparse
+import collections
+import datetime
+import gzip
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+import chess
+import chess.pgn
+from loguru import logger
+
+from . import database
+from .constants import WHITE, BLACK, DRAW
+from .database.move_encoding import encode_moves, split_history
+
+PARSE_BATCH_SIZE = 500  # games sent to a worker process at a time
+WINNERS = {"1-0": WHITE, "0-1": BLACK, "1/2-1/2": DRAW}
+
+
+def open_pgn(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", errors="replace")
+
+    return open(path, encoding="utf-8-sig", errors="replace")
+
+
+def read_game_texts(file: TextIO) -> Iterator[str]:
+    # splits the file into the text of each game without parsing it,
+    # a game ends where the tags of the next one start after its moves
+    lines: List[str] = []
+    in_moves = False
+    for line in file:
+        if line.startswith("["):
+            if in_moves:
+                yield "".join(lines)
+                lines, in_moves = [], False
+        elif line.strip() and not line.startswith("%"):
+            in_moves = True
+
+        lines.append(line)
+
+    if in_moves:
+        yield "".join(lines)
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime.datetime]:
+    try:
+        return datetime.datetime.strptime(value or "", "%Y.%m.%d")
+    except ValueError:
+        return None  # unknown, e.g. "????.??.??"
+
+
+def parse_game(text: str) -> Optional[Dict[str, Any]]:
+    game = chess.pgn.read_game(io.StringIO(text))
+    if game is None or getattr(game, "errors", None):
+        return None
+
+    winner = WINNERS.get(game.headers.get("Result"))
+    if winner is None or "FEN" in game.headers:
+        return None  # unfinished, or doesn't start from the starting position
+
+    board = game.board()
+    for move in game.mainline_moves():
+        board.push(move)
+
+    history_fen, history_ply = split_history(board)
+    created_date = _parse_date(game.headers.get("Date"))
+    finished_date = _parse_date(game.headers.get("EndDate")) or created_date
+    return {
+        "white": game.headers.get("White"),
+        "black": game.headers.get("Black"),
+        "moves": encode_moves(board.move_stack),
+        "fen": board.fen(),
+        "history_fen": history_fen,
+        "history_ply": history_ply,
+        "turn": WHITE if board.turn == chess.WHITE else BLACK,
+        "winner": winner,
+        "win_reason": game.headers.get("Termination", "Imported"),
+        "created_date": created_date or datetime.datetime.now(),
+        "finished_date": finished_date,
+        "expiration_date": None,  # finished games don't expire
+    }
+
+
+def parse_games(texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+    return [parse_game(text) for text in texts]
+
+
+def _get_batches(texts: Iterator[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def parse_all(
+    texts: Iterator[str], processes: int
+) -> Iterator[Optional[Dict[str, Any]]]:
+    # None for the games that can't be imported, they are counted as skipped
+    batches = _get_batches(texts, PARSE_BATCH_SIZE)
+    if processes <= 1:
+        for batch in batches:
+            yield from parse_games(batch)
+        return
+
+    # only a few batches are in flight, so the file is never read ahead in full
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending: "collections.deque" = collections.deque()
+        for batch in batches:
+            pending.append(executor.submit(parse_games, batch))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def get_user_ids(key: str) -> Dict[str, int]:
+    column = getattr(database.User, key)
+    return {
+        str(value): user_id
+        for value, user_id in database.session.query(column, database.User.id)
+        if value is not None
+    }
+
+
+def insert_games(rows: List[Dict[str, Any]]) -> None:
+    # render_nulls, otherwise None values are left out and the column defaults
+    # apply, e.g. a future expiration_date
+    database.session.bulk_insert_mappings(database.Game, rows, render_nulls=True)
+    if not database.commit_session():
+        raise SystemExit("Failed to save the games")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("files", nargs="+", metavar="FILE")
+    parser.add_argument(
+        "--key",
+        choices=["username", "discord_id"],
+        default="username",
+        help="the user column the player names are matched against (default: username)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="processes parsing the games (default: 1, in this process)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=5000, help="games inserted at a time"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    imported = skipped = unknown_players = 0
+    with database.session_scope():
+        user_ids = get_user_ids(args.key)
+        logger.info(f"Matching the players against {len(user_ids)} users")
+
+        rows: List[Dict[str, Any]] = []
+        for path in args.files:
+            with open_pgn(path) as file:
+                for game in parse_all(read_game_texts(file), args.processes):
+                    if game is None:
+                        skipped += 1
+                        continue
+
+                    white_id = user_ids.get(game.pop("white"))
+                    black_id = user_ids.get(game.pop("black"))
+                    if white_id is None or black_id is None:
+                        unknown_players += 1
+                        continue
+
+                    rows.append(dict(game, white_id=white_id, black_id=black_id))
+                    if len(rows) >= args.batch_size:
+                        insert_games(rows)
+                        imported += len(rows)
+                        rows = []
+
+                        elapsed = time.perf_counter() - start
+                        logger.info(
+                            f"Imported {imported} games ({imported / elapsed:.0f} games/s)"
+                        )
+
+        if rows:
+            insert_games(rows)
+            imported += len(rows)
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Imported {imported} games in {elapsed:.2f}s ({imported / elapsed:.0f} games/s), "
+        f"skipped {skipped} unfinished or invalid games "
+        f"and {unknown_players} games of unknown players"
+    )
+
+
+if __name__ == "__main__":
+    main()
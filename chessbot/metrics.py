@@ -0,0 +1,156 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+from loguru import logger
+
+# upper bounds of the histogram buckets in seconds, the last bucket is unbounded
+BUCKETS = [
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+]
+
+# the command that is being handled, copied into the database threads by run_sync
+current_command: contextvars.ContextVar = contextvars.ContextVar(
+    "current_command", default="background"
+)
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        # interpolates inside the bucket, like Prometheus' histogram_quantile
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count > 0 and seen + count >= rank:
+                if i == len(BUCKETS):
+                    return BUCKETS[-1]  # can't tell how far above the last bound it is
+
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                return lower + (BUCKETS[i] - lower) * (rank - seen) / count
+            seen += count
+
+        return BUCKETS[-1]
+
+
+class Metrics:
+    # phases: "total" (the whole command), "db" (run_sync), "load" (building the
+    # board), "move" (validating a move), "outcome" (game over checks), "render",
+    # "engine" (the bot's moves), "analysis" (/analyze) and "send" (ctx.send).
+    # "db" includes the phases that run in the database threads.
+    def __init__(self) -> None:
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()  # phases are also timed in the database threads
+
+    def observe(self, phase: str, seconds: float, command: str = None) -> None:
+        if command is None:
+            command = current_command.get()
+
+        with self._lock:
+            histogram = self._histograms.get((command, phase))
+            if histogram is None:
+                histogram = self._histograms[(command, phase)] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def timed(
+        self, phase: str, func: Callable[..., Awaitable[Any]]
+    ) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with self.timer(phase):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    def snapshot(self) -> List[Tuple[str, str, Histogram]]:
+        with self._lock:
+            snapshot = []
+            for (command, phase), histogram in sorted(self._histograms.items()):
+                copy = Histogram()
+                copy.counts = list(histogram.counts)
+                copy.count, copy.sum = histogram.count, histogram.sum
+                snapshot.append((command, phase, copy))
+
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP chessbot_command_duration_seconds Time spent in each phase of a command.",
+            "# TYPE chessbot_command_duration_seconds histogram",
+        ]
+        for command, phase, histogram in self.snapshot():
+            labels = f'command="{command}",phase="{phase}"'
+
+            cumulative = 0
+            for bound, count in zip([*BUCKETS, "+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(
+                    f'chessbot_command_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f"chessbot_command_duration_seconds_sum{{{labels}}} {histogram.sum}"
+            )
+            lines.append(
+                f"chessbot_command_duration_seconds_count{{{labels}}} {histogram.count}"
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(self.to_prometheus())
+        os.replace(temp_path, path)  # scrapers never see a partially written file
+
+    async def run_exporter(self, path: str, interval: float) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.write_prometheus, path)
+            except OSError as err:
+                logger.error(f"Failed to write the metrics to {path}: {err}")
+
+
+metrics = Metrics()
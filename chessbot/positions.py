@@ -0,0 +1,113 @@
+"""Fills in the position index for the games that aren't fully indexed yet.
+
+    python3 -m chessbot.positions backfill [--batch-size N]
+
+Run it once after upgrading, and after importing games. It can be stopped and
+run again at any time, also while the bot is running (it indexes new moves itself).
+"""
+import argparse
+import time
+from typing import Any, Dict, List
+
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.exc import DatabaseError
+
+from . import database
+from .cogs.utils import get_game_positions
+
+BATCH_ATTEMPTS = 3  # a batch can collide with the positions the bot indexes meanwhile
+
+
+def get_missing_positions(games: List[Any]) -> List[Dict[str, Any]]:
+    Position = database.Position
+    game_ids = [game_id for game_id, _ in games]
+    indexed = set(
+        database.session.query(Position.game_id, Position.ply).filter(
+            Position.game_id.in_(game_ids)
+        )
+    )
+
+    return [
+        position
+        for game_id, moves in games
+        for position in get_game_positions(game_id, moves)
+        if (position["game_id"], position["ply"]) not in indexed
+    ]
+
+
+def insert_positions(positions: List[Dict[str, Any]]) -> bool:
+    try:
+        if positions:
+            database.session.execute(database.Position.__table__.insert(), positions)
+    except DatabaseError as err:
+        logger.error(err)
+        database.session.rollback()
+        return False
+
+    return database.commit_session()
+
+
+def backfill(batch_size: int) -> int:
+    Game, Position = database.Game, database.Position
+    # games with fewer positions than plies + 1 (the starting position), e.g. games
+    # played before upgrading that got more moves afterwards
+    position_count = (
+        database.session.query(func.count())
+        .filter(Position.game_id == Game.id)
+        .correlate(Game)
+        .as_scalar()
+    )
+
+    indexed = 0
+    last_id = 0
+    start = time.perf_counter()
+    while True:
+        # keyset batches, each one is committed before the next one is read
+        games = (
+            database.session.query(Game.id, Game.moves)
+            .filter(Game.id > last_id)
+            .filter(position_count < func.length(Game.moves) / 2 + 1)
+            .order_by(Game.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not games:
+            return indexed
+
+        for _ in range(BATCH_ATTEMPTS):
+            if insert_positions(get_missing_positions(games)):
+                break
+
+            # e.g. the bot indexed a move of one of the games meanwhile,
+            # the next attempt skips the positions that are there now
+            logger.warning(f"Indexing games #{games[0][0]}-#{games[-1][0]} failed")
+        else:
+            raise SystemExit("Failed to save the positions")
+
+        indexed += len(games)
+        last_id = games[-1][0]
+        logger.info(
+            f"Indexed {indexed} games ({indexed / (time.perf_counter() - start):.0f} games/s)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="games indexed at a time"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with database.session_scope():
+        indexed = backfill(args.batch_size)
+
+    logger.info(f"Indexed {indexed} games in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Rebuilds every player's elo rating by replaying all finished games between players.
+
+    python3 -m chessbot.ratings rebuild [--dry-run] [--k K]
+
+The rating history (/elo history) is rebuilt along with the ratings. The bot keeps
+its leaderboard in memory, so restart it after a rebuild.
+"""
+import argparse
+import datetime
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy.orm import aliased
+
+from . import database
+from .constants import WHITE, BLACK, DRAW, ELO_K, result_to_int
+
+START_ELO = database.User.__table__.c.elo.default.arg
+BATCH_SIZE = 10000
+
+# the ids and rating dates of the replayed games, in replay order
+GameInfo = Tuple[List[int], List[datetime.datetime]]
+
+
+def load_games(
+    user_index: Dict[int, int]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, GameInfo]:
+    Game = database.Game
+    White, Black = aliased(database.User), aliased(database.User)
+    # games finished before finished_date was recorded come first, by id
+    query = (
+        database.session.query(
+            Game.white_id,
+            Game.black_id,
+            Game.winner,
+            Game.id,
+            Game.finished_date,
+            Game.created_date,
+        )
+        .filter(Game.winner.isnot(None))
+        .filter(Game.white_id.isnot(None))
+        .filter(Game.black_id.isnot(None))
+        .filter(Game.white_id != Game.black_id)  # doesn't change the rating
+        # games against bots are unrated, see recalculate_elo
+        .filter(Game.bot_level.is_(None))
+        .join(White, Game.white_id == White.id)
+        .join(Black, Game.black_id == Black.id)
+        .filter(White.is_bot.is_(False), Black.is_bot.is_(False))
+        .order_by(Game.finished_date.is_(None).desc(), Game.finished_date, Game.id)
+    )
+
+    scores = {winner: result_to_int(winner) for winner in [WHITE, BLACK, DRAW]}
+    white: List[int] = []
+    black: List[int] = []
+    white_score: List[float] = []
+    game_ids: List[int] = []
+    dates: List[datetime.datetime] = []
+
+    # plain rows instead of ORM results, loading them is most of the rebuild
+    result = database.session.execute(query.statement)
+    while True:
+        rows = result.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+
+        for white_id, black_id, winner, game_id, finished, created in rows:
+            white.append(user_index[white_id])
+            black.append(user_index[black_id])
+            white_score.append(scores[winner])
+            game_ids.append(game_id)
+            dates.append(finished or created or datetime.datetime.now())
+
+    return (
+        np.array(white, dtype=np.intp),
+        np.array(black, dtype=np.intp),
+        np.array(white_score, dtype=float),
+        (game_ids, dates),
+    )
+
+
+def get_rounds(white: np.ndarray, black: np.ndarray, players: int) -> List[np.ndarray]:
+    # splits the games into rounds in which every player plays at most once,
+    # keeping the order of each player's games, so that a round can be rated at once
+    game_round = np.empty(len(white), dtype=np.intp)
+    next_round = [0] * players
+    for i, (w, b) in enumerate(zip(white.tolist(), black.tolist())):
+        current = max(next_round[w], next_round[b])
+        game_round[i] = current
+        next_round[w] = next_round[b] = current + 1
+
+    order = np.argsort(game_round, kind="stable")
+    bounds = np.flatnonzero(np.diff(game_round[order])) + 1
+    return np.split(order, bounds) if len(order) > 0 else []
+
+
+def rebuild(
+    ratings: np.ndarray,
+    white: np.ndarray,
+    black: np.ndarray,
+    white_score: np.ndarray,
+    k: float,
+) -> np.ndarray:
+    # the same formula as recalculate_elo in elo_utils.py. Returns the ratings of
+    # both players before and after every game (white before, white after,
+    # black before, black after), for the rating history.
+    changes = np.empty((len(white), 4), dtype=float)
+    for games in get_rounds(white, black, len(ratings)):
+        w, b = white[games], black[games]
+        white_before, black_before = ratings[w], ratings[b]
+
+        expected = 1 / (1 + 10 ** ((black_before - white_before) / 400))
+        # Python's round, np.round rounds some values the other way
+        expected = np.array([round(value, 2) for value in expected.tolist()])
+        white_diff = (white_score[games] - expected) * k
+
+        ratings[w] = np.maximum(white_before + white_diff, 0)
+        ratings[b] = np.maximum(black_before - white_diff, 0)
+        changes[games] = np.column_stack(
+            [white_before, ratings[w], black_before, ratings[b]]
+        )
+
+    return changes
+
+
+def get_rating_changes(
+    user_ids: List[int],
+    white: np.ndarray,
+    black: np.ndarray,
+    changes: np.ndarray,
+    games: GameInfo,
+) -> List[Dict[str, Any]]:
+    # the rating_changes rows, in the order recalculate_elo would have added them
+    game_ids, dates = games
+    rows = []
+    players = zip(white.tolist(), black.tolist(), changes.tolist())
+    for i, (w, b, elos) in enumerate(players):
+        white_before, white_after, black_before, black_after = elos
+        for user, elo_before, elo_after in [
+            (w, white_before, white_after),
+            (b, black_before, black_after),
+        ]:
+            rows.append(
+                {
+                    "user_id": user_ids[user],
+                    "game_id": game_ids[i],
+                    "elo_before": elo_before,
+                    "elo_after": elo_after,
+                    "date": dates[i],
+                }
+            )
+
+    return rows
+
+
+def print_diff(
+    users: List[Tuple[int, str, float]], ratings: np.ndarray, limit: int
+) -> None:
+    changes = [
+        (new - old, name, old, new)
+        for (_, name, old), new in zip(users, ratings.tolist())
+        if old != new
+    ]
+    changes.sort(key=lambda change: -abs(change[0]))
+
+    for diff, name, old, new in changes[:limit]:
+        print(f"{name:>32}: {old:10.2f} -> {new:10.2f} ({diff:+.2f})")
+    if len(changes) > limit:
+        print(f"... and {len(changes) - limit} more")
+    print(f"{len(changes)} of {len(users)} ratings change")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--dry-run", action="store_true", help="only show the changes")
+    parser.add_argument(
+        "--k", type=float, default=ELO_K, help=f"the K-factor (default: {ELO_K})"
+    )
+    parser.add_argument(
+        "--limit", type=int, default=50, help="changes to show (default: 50)"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with database.session_scope():
+        users = [
+            (user_id, str(username or discord_id), elo)
+            for user_id, username, discord_id, elo in database.session.query(
+                database.User.id,
+                database.User.username,
+                database.User.discord_id,
+                database.User.elo,
+            ).order_by(database.User.id)
+        ]
+        user_index = {user_id: i for i, (user_id, _, _) in enumerate(users)}
+
+        white, black, white_score, games = load_games(user_index)
+        logger.info(
+            f"Loaded {len(white)} games of {len(users)} players in {time.perf_counter() - start:.2f}s"
+        )
+
+        ratings = np.full(len(users), START_ELO, dtype=float)
+        changes = rebuild(ratings, white, black, white_score, args.k)
+        logger.info(f"Rebuilt the ratings in {time.perf_counter() - start:.2f}s")
+
+        print_diff(users, ratings, args.limit)
+        if args.dry_run:
+            return
+
+        database.session.bulk_update_mappings(
+            database.User,
+            [
+                {"id": user_id, "elo": elo}
+                for (user_id, _, _), elo in zip(users, ratings.tolist())
+            ],
+        )
+
+        # the history is replaced in the same transaction, so /elo history
+        # agrees with the new ratings
+        RatingChange = database.RatingChange.__table__
+        database.session.execute(RatingChange.delete())
+        rows = get_rating_changes(
+            [user_id for user_id, _, _ in users], white, black, changes, games
+        )
+        for first in range(0, len(rows), BATCH_SIZE):
+            last = first + BATCH_SIZE
+            database.session.execute(RatingChange.insert(), rows[first:last])
+
+        if not database.commit_session():
+            raise SystemExit("Failed to save the ratings")
+
+    logger.info(f"Saved the ratings in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from loguru import logger
+
+RESTART_DELAY = 5  # seconds before a crashed bot process is started again
+
+
+def get_shard_ranges(shard_count: int, processes: int) -> List[List[int]]:
+    if shard_count < processes:
+        raise RuntimeError(
+            f"Can't split {shard_count} shards between {processes} processes"
+        )
+
+    shards = list(range(shard_count))
+    bounds = [i * shard_count // processes for i in range(processes + 1)]
+    return [shards[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def get_worker_env(
+    shard_ids: List[int], shard_count: int, first: bool
+) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        SHARD_IDS=",".join(str(shard_id) for shard_id in shard_ids),
+        SHARD_COUNT=str(shard_count),
+        SHARD_PROCESSES="1",
+        RUN_EXPIRATION="1" if first else "0",
+        RUN_MIGRATIONS="0",
+    )
+    # the settings that keep the processes consistent with each other
+    env.setdefault("EXPIRATION_POLL_INTERVAL", "60")
+    env.setdefault("LEADERBOARD_MAX_AGE", "30")
+
+    return env
+
+
+def launch(shard_count: int, processes: int) -> None:
+    # the database is already migrated by importing chessbot in this process,
+    # the bot processes skip it (RUN_MIGRATIONS=0) so they don't race to migrate it
+    envs = [
+        get_worker_env(shard_ids, shard_count, i == 0)
+        for i, shard_ids in enumerate(get_shard_ranges(shard_count, processes))
+    ]
+
+    def start(env: Dict[str, str]) -> subprocess.Popen:
+        logger.info(f"Starting a bot process for shards {env['SHARD_IDS']}")
+        return subprocess.Popen([sys.executable, "-m", "chessbot"], env=env)
+
+    workers = [start(env) for env in envs]
+    try:
+        while True:
+            time.sleep(1)
+            for i, worker in enumerate(workers):
+                code = worker.poll()
+                if code is not None:
+                    logger.error(
+                        f"The bot process for shards {envs[i]['SHARD_IDS']} exited with {code}"
+                    )
+                    time.sleep(RESTART_DELAY)
+                    workers[i] = start(envs[i])
+    except KeyboardInterrupt:
+        logger.info("Stopping the bot processes")
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
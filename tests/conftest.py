@@ -0,0 +1,34 @@
+import os
+
+# importing chessbot connects to the database, the tests use a throwaway one
+os.environ.setdefault("DB_PATH", "sqlite://")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def session():
+    # a session scope over an empty database, emptied again afterwards
+    from chessbot import database
+
+    with database.session_scope():
+        yield database.session
+
+        database.session.rollback()
+        for table in database.Base.metadata.tables.values():
+            database.session.execute(table.delete())
+        database.session.commit()
+
+
+@pytest.fixture
+def make_user(session):
+    from chessbot import database
+
+    def make_user(discord_id: int, elo: float = 1000) -> database.User:
+        user = database.User(discord_id=discord_id, username=f"player{discord_id}")
+        user.elo = elo
+        session.add(user)
+        session.flush()
+        return user
+
+    return make_user
@@ -0,0 +1,80 @@
+import pytest
+
+from chessbot import constants, database
+from chessbot.cogs.utils import elo_utils
+from chessbot.cogs.utils.elo_utils import recalculate_elo
+
+K = constants.ELO_K
+
+
+def change_elo_meanwhile(user_id: int, elo: float) -> None:
+    # e.g. another bot process finishing a game of the same player
+    other = database.Session()
+    other.query(database.User).get(user_id).elo = elo
+    other.commit()
+    other.close()
+
+
+def make_finished_game(session, make_user) -> database.Game:
+    game = database.Game(white=make_user(1, 1000), black=make_user(2, 1000))
+    game.winner, game.win_reason = constants.WHITE, "Checkmate"
+    session.add(game)
+    session.flush()
+    return game
+
+
+def get_ratings(session):
+    session.expire_all()
+    return [user.elo for user in session.query(database.User).order_by("id")]
+
+
+def test_rates_the_game(session, make_user) -> None:
+    game = make_finished_game(session, make_user)
+
+    recalculate_elo(game)
+    session.commit()
+
+    assert get_ratings(session) == [1000 + K / 2, 1000 - K / 2]
+
+
+def test_rates_again_with_a_rating_changed_meanwhile(session, make_user) -> None:
+    game = make_finished_game(session, make_user)
+    session.commit()
+    game.white.elo, game.black.elo  # read before the other process writes
+    change_elo_meanwhile(game.black.id, 1400)
+
+    recalculate_elo(game)
+    session.commit()
+
+    # expected 0.09 for white, white's first update was undone
+    assert get_ratings(session) == [1000 + 0.91 * K, 1400 - 0.91 * K]
+    changes = session.query(database.RatingChange).order_by("id").all()
+    assert [(change.elo_before, change.elo_after) for change in changes] == [
+        (1000, 1000 + 0.91 * K),
+        (1400, 1400 - 0.91 * K),
+    ]
+
+
+def test_gives_up_when_the_ratings_keep_changing(
+    session, make_user, monkeypatch
+) -> None:
+    game = make_finished_game(session, make_user)
+    session.commit()
+    game.white.elo, game.black.elo
+    change_elo_meanwhile(game.white.id, 1100)
+    reload_elo = elo_utils._reload_elo
+    attempts = []
+
+    def change_again(*users):
+        reload_elo(*users)
+        attempts.append(users)
+        change_elo_meanwhile(game.white.id, 1100 + len(attempts))
+
+    monkeypatch.setattr(elo_utils, "_reload_elo", change_again)
+
+    with pytest.raises(RuntimeError):
+        recalculate_elo(game)
+    session.rollback()
+
+    assert len(attempts) == elo_utils.ELO_ATTEMPTS
+    assert get_ratings(session) == [1100 + elo_utils.ELO_ATTEMPTS, 1000]
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import chess
+
+from chessbot.cogs.utils import engine_utils
+from chessbot.config import ENGINE_QUEUE_SIZE
+
+
+def test_plays_a_legal_move() -> None:
+    board = chess.Board()
+    move = asyncio.run(engine_utils.get_engine_move(board, 1))
+
+    assert move in board.legal_moves
+
+
+def test_saturated_pool_falls_back_to_a_quick_search(monkeypatch) -> None:
+    calls = []
+
+    def search(fen: str, max_depth: int, move_time: float):
+        calls.append((max_depth, move_time))
+        return "e2e4", {}
+
+    monkeypatch.setattr(engine_utils, "search", search)
+    monkeypatch.setattr(engine_utils._queue, "pending", ENGINE_QUEUE_SIZE)
+    move = asyncio.run(engine_utils.get_engine_move(chess.Board(), 3))
+
+    assert move == chess.Move.from_uci("e2e4")
+    assert calls == [(1, 0)]  # only the one ply search
+    assert engine_utils._queue.pending == ENGINE_QUEUE_SIZE
+
+
+def test_timeout_falls_back_and_counts_the_search_until_it_ends(monkeypatch) -> None:
+    real_search = engine_utils.search
+
+    def slow_search(fen: str, max_depth: int, move_time: float):
+        if move_time > 0:
+            time.sleep(0.5)  # the search of the level, the quick search has no time
+        return real_search(fen, max_depth, move_time)
+
+    _, move_time = engine_utils.ENGINE_LEVELS[0]
+    monkeypatch.setattr(engine_utils, "search", slow_search)
+    # gives up after 0.1 seconds
+    monkeypatch.setattr(engine_utils, "ENGINE_TIMEOUT_MARGIN", 0.1 - move_time)
+
+    async def play() -> None:
+        board = chess.Board()
+        start = time.perf_counter()
+        move = await engine_utils.get_engine_move(board, 1)
+
+        assert move in board.legal_moves
+        assert time.perf_counter() - start < 0.4
+        assert engine_utils._queue.pending == 1  # the slow search is still running
+
+        await asyncio.sleep(0.6)
+        assert engine_utils._queue.pending == 0
+
+    asyncio.run(play())
@@ -0,0 +1,167 @@
+import datetime
+
+import pytest
+
+from chessbot import constants, database
+from chessbot.cogs.utils import expiration_scheduler, game_utils
+from chessbot.cogs.utils.game_utils import (
+    expire_games,
+    get_user_games,
+    parse_games_args,
+)
+
+
+def make_expired_games(session, make_user, count: int):
+    past = datetime.datetime.now() - datetime.timedelta(hours=1)
+    players = [make_user(i + 1) for i in range(count + 1)]
+    games = []
+    for i in range(count):
+        game = database.Game(white=players[i], black=players[i + 1])
+        game.expiration_date = past + datetime.timedelta(minutes=i)
+        games.append(game)
+    session.add_all(games)
+    session.commit()
+    return [game.id for game in games]
+
+
+def test_expires_every_due_game(session, make_user) -> None:
+    game_ids = make_expired_games(session, make_user, 3)
+
+    assert expire_games() == 3
+
+    session.expire_all()
+    for game in session.query(database.Game).filter(database.Game.id.in_(game_ids)):
+        assert game.winner == constants.BLACK  # white was to move
+        assert game.win_reason == "Game expired"
+        assert game.finished_date == game.expiration_date
+    assert session.query(database.RatingChange).count() == 6
+
+
+def test_ongoing_games_are_left_alone(session, make_user) -> None:
+    make_expired_games(session, make_user, 1)
+    game = database.Game(white=make_user(10), black=make_user(11))
+    session.add(game)
+    session.commit()
+
+    assert expire_games() == 1
+    session.refresh(game)
+    assert game.winner is None
+
+
+def test_a_game_changed_meanwhile_only_fails_itself(
+    session, make_user, monkeypatch
+) -> None:
+    first, second, third = make_expired_games(session, make_user, 3)
+    expire_and_commit = game_utils._expire_and_commit
+    calls = []
+
+    def finish_second_game_meanwhile(games):
+        if not calls:
+            # e.g. a /concede in another process, it bumps the game's version
+            other = database.Session()
+            game = other.query(database.Game).get(second)
+            game.winner, game.win_reason = constants.WHITE, "Black conceded"
+            game.expiration_date = None
+            other.commit()
+            other.close()
+        calls.append([game.id for game in games])
+        return expire_and_commit(games)
+
+    monkeypatch.setattr(game_utils, "_expire_and_commit", finish_second_game_meanwhile)
+    monkeypatch.setattr(expiration_scheduler, "_due", {})
+
+    assert expire_games() == 2
+    # the sweep failed as a whole, then each remaining game was committed on its own
+    assert calls == [[first, second, third], [first], [third]]
+
+    session.expire_all()
+    winners = {
+        game.id: (game.winner, game.win_reason) for game in session.query(database.Game)
+    }
+    assert winners[first] == (constants.BLACK, "Game expired")
+    assert winners[second] == (constants.WHITE, "Black conceded")
+    assert winners[third] == (constants.BLACK, "Game expired")
+    assert expiration_scheduler._due == {}  # nothing left to retry
+
+
+def test_parse_games_args() -> None:
+    assert parse_games_args(
+        ["all", "before:42", "<@!7>", "from:2020-01-02", "to:2020-01-31"]
+    ) == {
+        "status": "all",
+        "before_id": 42,
+        "opponent_id": 7,
+        "since": datetime.datetime(2020, 1, 2),
+        "until": datetime.datetime(2020, 2, 1),
+    }
+
+
+@pytest.mark.parametrize("arg", ["42", "before:", "before:last", "page:2"])
+def test_parse_games_args_rejects(arg) -> None:
+    with pytest.raises(ValueError):
+        parse_games_args([arg])
+
+
+def make_games(session, make_user):
+    # 12 games of player 1, against players 2 and 3 in turn, every third one finished
+    user, opponents = make_user(1), [make_user(2), make_user(3)]
+    start = datetime.datetime(2020, 1, 1)
+    games = []
+    for i in range(12):
+        game = database.Game(white=user, black=opponents[i % 2])
+        game.created_date = start + datetime.timedelta(days=i)
+        if i % 3 == 0:
+            game.winner, game.win_reason = constants.WHITE, "Checkmate"
+        games.append(game)
+    session.add_all(games)
+    session.commit()
+    return user, games
+
+
+def get_all_pages(user, **filters):
+    pages, before_id = [], None
+    while True:
+        games, before_id = get_user_games(
+            user, before_id=before_id, page_size=2, **filters
+        )
+        pages.append([game.id for game in games])
+        if before_id is None:
+            return pages
+
+
+def test_pages_of_all_games(session, make_user) -> None:
+    user, games = make_games(session, make_user)
+    ids = [game.id for game in reversed(games)]
+
+    assert get_all_pages(user, status="all") == [
+        list(pair) for pair in zip(ids[::2], ids[1::2])
+    ]
+
+
+def test_pages_keep_the_filters(session, make_user) -> None:
+    user, games = make_games(session, make_user)
+    # ongoing games against player 3 (odd indexes that aren't multiples of 3)
+    expected = [games[i].id for i in [11, 7, 5, 1]]
+
+    assert get_all_pages(user, opponent_id=3) == [expected[:2], expected[2:]]
+
+
+def test_pages_with_dates(session, make_user) -> None:
+    user, games = make_games(session, make_user)
+    # January 3rd to 8th, both included
+    filters = parse_games_args(["finished", "from:2020-01-03", "to:2020-01-08"])
+    pages = get_all_pages(user, **filters)
+
+    assert pages == [[games[6].id, games[3].id]]
+
+
+def test_last_page_is_not_followed_by_an_empty_one(session, make_user) -> None:
+    user, games = make_games(session, make_user)
+
+    page, before_id = get_user_games(user, status="all", page_size=12)
+    assert len(page) == 12 and before_id is None
+
+    page, before_id = get_user_games(user, status="all", page_size=11)
+    assert before_id == games[1].id
+    page, before_id = get_user_games(user, status="all", before_id=before_id)
+    assert [game.id for game in page] == [games[0].id] and before_id is None
@@ -0,0 +1,95 @@
+import pytest
+
+from chessbot.cogs.utils import leaderboard_utils
+from chessbot.cogs.utils.leaderboard_utils import Leaderboard
+
+
+@pytest.fixture
+def leaderboard(monkeypatch, session):
+    monkeypatch.setattr(leaderboard_utils, "LEADERBOARD_SIZE", 3)
+    return Leaderboard()
+
+
+def get_ratings(leaderboard: Leaderboard):
+    return [-entry[0] for entry in leaderboard._entries]
+
+
+def test_load_keeps_the_top(leaderboard, make_user) -> None:
+    for i, elo in enumerate([1000, 1400, 1200]):
+        make_user(i + 1, elo)
+    leaderboard.load()
+
+    assert get_ratings(leaderboard) == [1400, 1200, 1000]
+    assert leaderboard._complete
+    assert not leaderboard.stale
+
+
+def test_rising_above_the_cutoff(leaderboard, make_user) -> None:
+    users = [make_user(i + 1, elo) for i, elo in enumerate([1400, 1300, 1200, 1100])]
+    leaderboard.load()
+    assert not leaderboard._complete
+
+    users[3].elo = 1250
+    leaderboard.update(users[3])
+
+    assert get_ratings(leaderboard) == [1400, 1300, 1250]
+    assert set(leaderboard._user_ids) == {users[0].id, users[1].id, users[3].id}
+    assert not leaderboard.stale
+
+
+def test_staying_below_the_cutoff(leaderboard, make_user) -> None:
+    users = [make_user(i + 1, elo) for i, elo in enumerate([1400, 1300, 1200, 1100])]
+    leaderboard.load()
+
+    # a tie with the last entry doesn't get ahead of the one that was there first
+    users[3].elo = 1200
+    leaderboard.update(users[3])
+
+    assert get_ratings(leaderboard) == [1400, 1300, 1200]
+    assert users[3].id not in leaderboard._user_ids
+
+
+def test_falling_below_the_cutoff_makes_it_stale(leaderboard, make_user) -> None:
+    users = [make_user(i + 1, elo) for i, elo in enumerate([1400, 1300, 1200, 1100])]
+    leaderboard.load()
+
+    users[0].elo = 1000
+    leaderboard.update(users[0])
+    assert leaderboard.stale
+
+    leaderboard.load()
+    assert get_ratings(leaderboard) == [1300, 1200, 1100]
+
+
+def test_updates_of_a_stale_list_are_skipped(monkeypatch, leaderboard, make_user):
+    monkeypatch.setattr(leaderboard_utils, "LEADERBOARD_SIZE", 1)
+    users = [make_user(i + 1, elo) for i, elo in enumerate([1400, 1300])]
+    leaderboard.load()
+
+    users[0].elo = 1000
+    leaderboard.update(users[0])  # empties the kept entries
+    assert leaderboard.stale
+
+    users[1].elo = 1350
+    leaderboard.update(users[1])
+    users[0].elo = 1500
+    leaderboard.update(users[0])
+
+    leaderboard.load()
+    assert get_ratings(leaderboard) == [1500]
+
+
+def test_update_keeps_a_complete_list(leaderboard, make_user) -> None:
+    users = [make_user(i + 1, elo) for i, elo in enumerate([1400, 1300])]
+    leaderboard.load()
+
+    users[0].elo = 1000
+    leaderboard.update(users[0])
+
+    assert get_ratings(leaderboard) == [1300, 1000]
+    assert not leaderboard.stale
+    assert leaderboard.get_message(3) == (
+        "__Global leaderboard:__\n\n"
+        "**[1]** player2 - 1300 elo.\n"
+        "**[2]** player1 - 1000 elo."
+    )
@@ -0,0 +1,116 @@
+import random
+
+import chess
+import pytest
+
+from chessbot import database
+from chessbot.cogs.utils import chess_utils
+from chessbot.cogs.utils.chess_utils import load_board, save_board
+from chessbot.database.move_encoding import (
+    decode_moves,
+    encode_moves,
+    get_ply,
+    split_history,
+)
+
+
+def play_random_game(seed: int, plies: int = 200) -> chess.Board:
+    rng = random.Random(seed)
+    board = chess.Board()
+    while len(board.move_stack) < plies and not board.is_game_over():
+        board.push(rng.choice(list(board.legal_moves)))
+
+    return board
+
+
+def play(*sans: str) -> chess.Board:
+    board = chess.Board()
+    for san in sans:
+        board.push_san(san)
+
+    return board
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_moves_round_trip(seed: int) -> None:
+    moves = play_random_game(seed).move_stack
+    data = encode_moves(moves)
+
+    assert len(data) == 2 * len(moves)
+    assert decode_moves(data) == moves
+
+
+def test_special_moves_round_trip() -> None:
+    moves = [
+        chess.Move.from_uci("e1g1"),  # castling
+        chess.Move.from_uci("e5d6"),  # en passant
+        *[chess.Move.from_uci(f"a7a8{piece}") for piece in "nbrq"],
+        chess.Move.from_uci("h2h1q"),
+    ]
+
+    assert decode_moves(encode_moves(moves)) == moves
+    assert decode_moves(b"") == []
+
+
+def test_ply() -> None:
+    assert get_ply(chess.Board()) == 0
+    assert get_ply(play("e4")) == 1
+    assert get_ply(play("e4", "e5")) == 2
+
+
+def test_history_starts_before_the_last_irreversible_move() -> None:
+    board = play("e4", "e5", "Nf3", "Nc6", "Ng1", "Nb8")
+    history_fen, history_ply = split_history(board)
+
+    # e5 was the last pawn move, the knight moves after it are replayed
+    assert history_ply == 1
+    assert history_fen == play("e4").fen()
+
+
+def test_history_of_a_board_without_moves() -> None:
+    board = chess.Board()
+
+    assert split_history(board) == (board.fen(), 0)
+
+
+def make_game(game_id: int, board: chess.Board) -> database.Game:
+    game = database.Game(id=game_id, moves=b"")
+    save_board(game, board)
+    chess_utils._board_cache.clear()  # loads replay the moves
+    return game
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_load_board_restores_the_game(seed: int) -> None:
+    board = play_random_game(seed)
+    loaded = load_board(make_game(seed, board))
+
+    assert loaded.fen() == board.fen()
+    # only the moves since the last irreversible one are replayed
+    first = len(board.move_stack) - len(loaded.move_stack)
+    assert loaded.move_stack == board.move_stack[first:]
+
+    full = load_board(make_game(seed, board), full_history=True)
+    assert full.move_stack == board.move_stack
+
+
+def test_load_board_keeps_enough_history_for_repetitions() -> None:
+    board = play("Nf3", "Nf6", "Ng1", "Ng8", "Nf3", "Nf6", "Ng1", "Ng8")
+    loaded = load_board(make_game(1, board))
+
+    assert board.can_claim_threefold_repetition()
+    assert loaded.can_claim_threefold_repetition()
+
+
+def test_saving_a_partial_board_keeps_the_earlier_moves() -> None:
+    board = play("e4", "e5", "Nf3", "Nc6")
+    game = make_game(1, board)
+
+    loaded = load_board(game)
+    loaded.push_san("Bb5")
+    save_board(game, loaded)
+    chess_utils._board_cache.clear()
+
+    board.push_san("Bb5")
+    assert decode_moves(game.moves) == board.move_stack
+    assert load_board(game).fen() == board.fen()
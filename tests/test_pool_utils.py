@@ -0,0 +1,64 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from chessbot.cogs.utils.pool_utils import PoolQueue, PoolSaturated, submit_bounded
+
+
+def slow_add(a: int, b: int, seconds: float) -> int:
+    time.sleep(seconds)
+    return a + b
+
+
+def fail() -> None:
+    raise ValueError("failed")
+
+
+def test_returns_the_result() -> None:
+    queue = PoolQueue("test", 2)
+    result = asyncio.run(submit_bounded(None, queue, slow_add, 1, 2, 0, timeout=1))
+
+    assert result == 3
+    assert queue.pending == 0
+
+
+def test_raises_the_error_of_the_call() -> None:
+    queue = PoolQueue("test", 2)
+    with pytest.raises(ValueError):
+        asyncio.run(submit_bounded(None, queue, fail, timeout=1))
+
+    assert queue.pending == 0
+
+
+def test_full_queue_is_saturated() -> None:
+    queue = PoolQueue("test", 1)
+
+    async def submit_two() -> None:
+        first = asyncio.ensure_future(
+            submit_bounded(None, queue, slow_add, 1, 2, 0.2, timeout=1)
+        )
+        await asyncio.sleep(0)  # the first call is submitted
+        with pytest.raises(PoolSaturated):
+            await submit_bounded(None, queue, slow_add, 3, 4, 0, timeout=1)
+        assert await first == 3
+
+    asyncio.run(submit_two())
+    assert queue.pending == 0
+
+
+def test_timed_out_call_is_counted_until_it_ends() -> None:
+    queue = PoolQueue("test", 1)
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def time_out() -> None:
+        with pytest.raises(asyncio.TimeoutError):
+            await submit_bounded(executor, queue, slow_add, 1, 2, 0.3, timeout=0.05)
+        assert queue.pending == 1
+
+        await asyncio.sleep(0.5)
+        assert queue.pending == 0
+
+    asyncio.run(time_out())
+    executor.shutdown()
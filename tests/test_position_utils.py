@@ -0,0 +1,53 @@
+import chess
+import pytest
+
+from chessbot import database
+from chessbot.cogs.utils.position_utils import (
+    find_games_by_position,
+    get_game_positions,
+    get_ply_name,
+)
+from chessbot.database.move_encoding import encode_moves
+
+
+@pytest.mark.parametrize(
+    "ply, name",
+    [
+        (0, "Starting position"),
+        (1, "After white's move 1"),
+        (2, "After black's move 1"),
+        (3, "After white's move 2"),
+        (10, "After black's move 5"),
+    ],
+)
+def test_get_ply_name(ply, name) -> None:
+    assert get_ply_name(ply) == name
+
+
+def play(*sans: str) -> chess.Board:
+    board = chess.Board()
+    for san in sans:
+        board.push_san(san)
+    return board
+
+
+def make_indexed_game(session, white, black, board) -> database.Game:
+    game = database.Game(white=white, black=black)
+    game.moves = encode_moves(board.move_stack)
+    session.add(game)
+    session.flush()
+    session.bulk_insert_mappings(
+        database.Position, get_game_positions(game.id, game.moves)
+    )
+    return game
+
+
+def test_finds_transpositions(session, make_user) -> None:
+    white, black = make_user(1), make_user(2)
+    first = make_indexed_game(session, white, black, play("Nf3", "Nf6", "d4"))
+    second = make_indexed_game(session, white, black, play("d4", "Nf6", "Nf3", "e6"))
+
+    board = play("d4", "Nf6", "Nf3")
+    assert find_games_by_position(board) == [(second, 3), (first, 3)]
+    assert find_games_by_position(chess.Board()) == [(second, 0), (first, 0)]
+    assert find_games_by_position(play("d4", "Nf6", "Nf3", "e6")) == [(second, 4)]
@@ -0,0 +1,75 @@
+import datetime
+import random
+
+import numpy as np
+
+from chessbot import constants, database, ratings
+from chessbot.cogs.utils.elo_utils import recalculate_elo
+
+RESULTS = [constants.WHITE, constants.BLACK, constants.DRAW]
+
+
+def play_games(session, make_user, count: int):
+    # finishes the games one at a time, like the bot does
+    rng = random.Random(1)
+    players = [make_user(i + 1) for i in range(5)]
+    bot = make_user(100)
+    bot.is_bot = True
+
+    start = datetime.datetime(2020, 1, 1)
+    for i in range(count):
+        white, black = rng.sample(players, 2)
+        game = database.Game(white=white, black=black)
+        if i % 7 == 0:
+            game.black, game.bot_level = bot, 1  # unrated
+        game.winner, game.win_reason = rng.choice(RESULTS), "Test"
+        game.finished_date = start + datetime.timedelta(hours=i)
+        session.add(game)
+        session.flush()
+
+        recalculate_elo(game)
+        session.commit()
+
+    session.expire_all()
+    return players
+
+
+def rebuild_all(session):
+    users = session.query(database.User).order_by(database.User.id).all()
+    user_index = {user.id: i for i, user in enumerate(users)}
+
+    white, black, white_score, games = ratings.load_games(user_index)
+    elos = np.full(len(users), ratings.START_ELO, dtype=float)
+    changes = ratings.rebuild(elos, white, black, white_score, constants.ELO_K)
+    rows = ratings.get_rating_changes(
+        [user.id for user in users], white, black, changes, games
+    )
+    return users, elos, rows
+
+
+def test_rebuilt_ratings_match_the_incremental_ones(session, make_user) -> None:
+    play_games(session, make_user, 40)
+
+    users, elos, _ = rebuild_all(session)
+
+    assert elos.tolist() == [user.elo for user in users]
+    assert len({user.elo for user in users if not user.is_bot}) > 1
+
+
+def test_rebuilt_history_matches_the_incremental_one(session, make_user) -> None:
+    play_games(session, make_user, 40)
+
+    _, _, rows = rebuild_all(session)
+
+    RatingChange = database.RatingChange
+    history = [
+        (change.user_id, change.game_id, change.elo_before, change.elo_after)
+        for change in session.query(RatingChange).order_by(RatingChange.id)
+    ]
+    rebuilt = [
+        (row["user_id"], row["game_id"], row["elo_before"], row["elo_after"])
+        for row in rows
+    ]
+    assert rebuilt == history
+    # the games against the bot are left out
+    assert len(history) == 2 * len([i for i in range(40) if i % 7 != 0])
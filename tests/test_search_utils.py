@@ -0,0 +1,82 @@
+import chess
+import pytest
+
+from chessbot.cogs.utils.search_utils import MATE_BOUND, evaluate, search
+
+
+def search_move(fen: str, depth: int = 3) -> chess.Move:
+    # plenty of time, so that every iteration up to the depth finishes
+    uci, _ = search(fen, depth, 30)
+    return chess.Move.from_uci(uci)
+
+
+def test_starting_position_is_balanced() -> None:
+    assert evaluate(chess.Board()) == 0
+
+
+def test_evaluation_is_from_the_side_to_move() -> None:
+    board = chess.Board("4k3/8/8/8/8/8/8/3QK3 w - - 0 1")
+    assert evaluate(board) > 0
+
+    board.turn = chess.BLACK
+    assert evaluate(board) < 0
+
+
+@pytest.mark.parametrize(
+    "fen, mate",
+    [
+        ("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1", "d1d8"),
+        ("3r2k1/5ppp/8/8/8/8/5PPP/6K1 b - - 0 1", "d8d1"),
+        ("r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 2 3", "f3f7"),
+    ],
+)
+def test_finds_mate_in_one(fen: str, mate: str) -> None:
+    uci, stats = search(fen, 3, 30)
+
+    assert uci == mate
+    assert stats["score"] > MATE_BOUND
+
+
+def test_mates_instead_of_stalemating() -> None:
+    # most queen moves stalemate black, Qc8 mates
+    fen = "k7/2Q5/1K6/8/8/8/8/8 w - - 0 1"
+    board = chess.Board(fen)
+    board.push(search_move(fen))
+
+    assert board.is_checkmate()
+
+
+def test_avoids_a_stalemating_capture() -> None:
+    # Qxg6 wins the rook but leaves black without a legal move
+    fen = "7k/8/2Q3r1/8/3K4/8/8/8 w - - 0 1"
+    board = chess.Board(fen)
+    move = search_move(fen)
+    board.push(move)
+
+    assert move != chess.Move.from_uci("c6g6")
+    assert not board.is_stalemate()
+
+
+def test_wins_a_hanging_queen() -> None:
+    fen = "rnb1kbnr/pppp1ppp/8/4p3/4P2q/5N2/PPPP1PPP/RNBQKB1R w KQkq - 0 3"
+    assert search_move(fen) == chess.Move.from_uci("f3h4")
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",  # mated
+        "k7/2Q5/2K5/8/8/8/8/8 b - - 0 1",  # stalemated
+    ],
+)
+def test_game_over_raises(fen: str) -> None:
+    assert chess.Board(fen).is_game_over()
+    with pytest.raises(RuntimeError):
+        search(fen, 3, 1)
+
+
+def test_stops_at_the_deadline() -> None:
+    _, stats = search(chess.STARTING_FEN, 64, 0.2)
+
+    assert 1 <= stats["depth"] < 64
+    assert stats["seconds"] < 1